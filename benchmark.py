@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""End-to-end throughput benchmark for the reservation fill path
+
+Starts mock_cloudbeds.py in a subprocess, points the app at it, runs a full
+fill through POST /api/create-reservations and reports reservations/sec,
+p50/p99 latency per postReservation attempt, time spent waiting on the rate
+limiter, and CPU time and memory per 1,000 reservations.
+
+    python benchmark.py --days 30 --percentage 80 --workers 8 --rps 50
+    python benchmark.py --error-rate 0.05 --throttle-rate 0.02 --output bench.json
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from datetime import date, timedelta
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))]
+
+
+def start_mock(args):
+    cmd = [
+        sys.executable, os.path.join(HERE, 'mock_cloudbeds.py'),
+        '--port', str(args.port),
+        '--room-types', args.room_types,
+        '--latency-ms', str(args.latency_ms),
+        '--jitter-ms', str(args.jitter_ms),
+        '--error-rate', str(args.error_rate),
+        '--throttle-rate', str(args.throttle_rate),
+        '--rate-limit', str(args.rate_limit),
+        '--ambiguous-rate', str(args.ambiguous_rate),
+        '--seed', str(args.seed)
+    ]
+    process = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    stats_url = f'http://127.0.0.1:{args.port}/mock/stats'
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(stats_url, timeout=1).read()
+            return process
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError(f"Mock server did not start on port {args.port}")
+
+
+def fetch_mock_stats(port):
+    with urllib.request.urlopen(f'http://127.0.0.1:{port}/mock/stats', timeout=5) as response:
+        return json.loads(response.read())
+
+
+def run_benchmark(args):
+    mock_process = start_mock(args)
+    journal_dir = tempfile.mkdtemp(prefix='fill-bench-')
+    try:
+        os.environ['CLOUDBEDS_API_BASE'] = f'http://127.0.0.1:{args.port}/api/v1.3'
+        os.environ['FILL_JOURNAL_PATH'] = os.path.join(journal_dir, 'fill_journal.db')
+        sys.path.insert(0, HERE)
+        import main
+
+        # Per-attempt latency of postReservation, timed around the HTTP exchange only
+        # (the same figure the API latency histogram records)
+        latencies = []
+        original_observe = main.metrics.observe
+
+        def recording_observe(name, value, **labels):
+            if name == 'cloudbeds_api_request_duration_seconds' and labels.get('endpoint') == 'postReservation':
+                latencies.append(value)
+            return original_observe(name, value, **labels)
+
+        main.metrics.observe = recording_observe
+
+        # Time spent blocked on rate-limit tokens, reported separately from latency
+        limiter_waits = []
+        original_acquire = main.TokenBucket.acquire
+        original_acquire_async = main.TokenBucket.acquire_async
+
+        def timed_acquire(self, tokens=1):
+            started = time.perf_counter()
+            try:
+                return original_acquire(self, tokens)
+            finally:
+                limiter_waits.append(time.perf_counter() - started)
+
+        async def timed_acquire_async(self, tokens=1):
+            started = time.perf_counter()
+            try:
+                return await original_acquire_async(self, tokens)
+            finally:
+                limiter_waits.append(time.perf_counter() - started)
+
+        main.TokenBucket.acquire = timed_acquire
+        main.TokenBucket.acquire_async = timed_acquire_async
+
+        client = main.app.test_client()
+        with client.session_transaction() as session:
+            session['access_token'] = 'benchmark-token'
+            session['property_id'] = '1'
+
+        room_types = client.get('/api/room-types').get_json()['data']
+        start = date.today() + timedelta(days=1)
+        body = {
+            'startDate': start.isoformat(),
+            'endDate': (start + timedelta(days=args.days)).isoformat(),
+            'roomTypeConfigs': [dict(rt, percentage=args.percentage) for rt in room_types],
+            'maxWorkers': args.workers,
+            'requestsPerSecond': args.rps,
+            'burst': args.burst,
+            'maxRoomsPerReservation': args.max_rooms,
+            'groupAcrossRoomTypes': args.group_across_room_types,
+            'preflight': args.preflight,
+            'asyncDispatch': args.async_dispatch,
+            'maxInFlight': args.max_in_flight,
+            'profile': args.profile,
+            'seed': args.seed
+        }
+
+        # Keep per-reservation log lines out of the numbers; warnings still show
+        log_level = main.log.level
+        main.log.setLevel('WARNING')
+        latencies.clear()
+        limiter_waits.clear()
+        rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        cpu_before = time.process_time()
+        wall_before = time.perf_counter()
+        try:
+            job_id = client.post('/api/create-reservations', json=body).get_json()['data']['job_id']
+            job = main.job_manager.get(job_id)
+            while job.status not in main.JobManager.FINISHED_STATES:
+                time.sleep(0.05)
+        finally:
+            main.log.setLevel(log_level)
+        wall = time.perf_counter() - wall_before
+        cpu = time.process_time() - cpu_before
+        rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+        if job.status == 'failed':
+            raise RuntimeError(f"Fill job failed: {job.error}")
+
+        summary = job.result['summary']
+        attempted = summary['total_created'] + summary['total_errors']
+        per_thousand = 1000 / attempted if attempted else 0
+        call_latencies = sorted(latencies)
+        mock_stats = fetch_mock_stats(args.port)
+
+        report = {
+            'config': {k: v for k, v in vars(args).items() if k != 'output'},
+            'reservations': {
+                'planned': job.progress['total'],
+                'created': summary['total_created'],
+                'errors': summary['total_errors'],
+                'api_reservations': summary['reservations_created'],
+                'retries': sum(r['retries'] for r in job.result['results'])
+            },
+            'wall_seconds': round(wall, 3),
+            'reservations_per_second': round(attempted / wall, 2) if wall else None,
+            'latency_ms': {
+                'p50': round(percentile(call_latencies, 50) * 1000, 2) if call_latencies else None,
+                'p99': round(percentile(call_latencies, 99) * 1000, 2) if call_latencies else None,
+                'max': round(call_latencies[-1] * 1000, 2) if call_latencies else None
+            },
+            'rate_limiter_wait': {
+                'total_seconds': round(sum(limiter_waits), 3),
+                'mean_ms': round(sum(limiter_waits) / len(limiter_waits) * 1000, 2) if limiter_waits else None
+            },
+            'cpu_seconds_per_1000': round(cpu * per_thousand, 4),
+            # ru_maxrss is in KiB on Linux
+            'peak_rss_growth_kib_per_1000': round((rss_after - rss_before) * per_thousand, 1),
+            'mock': mock_stats['stats']
+        }
+        if 'profile' in job.result:
+            report['profile'] = job.result['profile']
+        return report
+    finally:
+        mock_process.terminate()
+        mock_process.wait(timeout=5)
+
+
+def print_report(report):
+    print("=" * 60)
+    print("FILL BENCHMARK")
+    print("=" * 60)
+    res = report['reservations']
+    print(f"Room-stays: {res['created']} created in {res['api_reservations']} reservations, {res['errors']} errors, "
+          f"{res['retries']} retries (planned {res['planned']})")
+    print(f"Wall time: {report['wall_seconds']}s")
+    print(f"Throughput: {report['reservations_per_second']} room-stays/sec")
+    lat = report['latency_ms']
+    print(f"Attempt latency: p50 {lat['p50']}ms, p99 {lat['p99']}ms, max {lat['max']}ms")
+    wait = report['rate_limiter_wait']
+    print(f"Rate-limiter wait: {wait['total_seconds']}s total, {wait['mean_ms']}ms mean per token")
+    print(f"CPU per 1,000 reservations: {report['cpu_seconds_per_1000']}s")
+    print(f"Peak RSS growth per 1,000 reservations: {report['peak_rss_growth_kib_per_1000']} KiB")
+    print(f"Mock server: {json.dumps(report['mock'])}")
+    if 'profile' in report:
+        print(f"Phases ({report['profile']['bottleneck']}-bound):")
+        for name, phase in sorted(report['profile']['phases'].items(), key=lambda item: -item[1]['wall_seconds']):
+            cpu = f"{phase['cpu_seconds']}s" if phase['cpu_seconds'] is not None else '-'
+            print(f"  {name:<22} {phase['calls']:>7} calls  wall {phase['wall_seconds']}s  cpu {cpu}")
+    print("=" * 60)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="End-to-end fill benchmark against the mock Cloudbeds API")
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--room-types', default='Standard:50,Deluxe:20,Suite:10')
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--percentage', type=float, default=80)
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--rps', type=float, default=100, help="Client-side requests/sec limit")
+    parser.add_argument('--burst', type=int, default=20)
+    parser.add_argument('--max-rooms', type=int, default=1, help="maxRoomsPerReservation (1 = one room per call)")
+    parser.add_argument('--group-across-room-types', action='store_true')
+    parser.add_argument('--preflight', action='store_true', help="Check availability before dispatch")
+    parser.add_argument('--async-dispatch', action='store_true', help="Send from the asyncio event loop instead of worker threads")
+    parser.add_argument('--max-in-flight', type=int, default=100, help="In-flight calls with --async-dispatch")
+    parser.add_argument('--profile', action='store_true', help="Report wall and CPU time per fill phase")
+    parser.add_argument('--latency-ms', type=float, default=50)
+    parser.add_argument('--jitter-ms', type=float, default=20)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--throttle-rate', type=float, default=0.0)
+    parser.add_argument('--rate-limit', type=float, default=0.0, help="Mock server-side requests/sec limit")
+    parser.add_argument('--ambiguous-rate', type=float, default=0.0,
+                        help="Fraction of reservations the mock books but answers with HTTP 504")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', '-o', help="Write the report as JSON to this file")
+    return parser
+
+
+if __name__ == '__main__':
+    args = build_parser().parse_args()
+    report = run_benchmark(args)
+    print_report(report)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""Command-line tools for the Cloudbeds Reservation Creator
+
+Usage:
+    python cli.py plan fill.json [--output plan.json] [--include-reservations]
+    python cli.py fill manifest.json [--parallel 4] [--summary summary.json]
+    python cli.py cleanup --property-id 6000 [--source journal|api] [--job-id ID] [--prefix demo-]
+
+The fill file uses the same JSON body as POST /api/create-reservations
+(startDate, endDate, roomTypeConfigs, allotmentBlockCode).
+
+A manifest fills many properties in one run. "defaults" apply to every
+property; each property needs a propertyID, an access token (accessTokenEnv
+names an environment variable holding it, so tokens stay out of the file)
+and either roomTypeConfigs or a percentage applied to every room type:
+
+    {
+      "defaults": {"startDate": "2026-01-01", "endDate": "2026-03-31", "requestsPerSecond": 5},
+      "properties": [
+        {"propertyID": "6000", "accessTokenEnv": "CB_TOKEN_6000", "percentage": 70},
+        {"propertyID": "6001", "accessTokenEnv": "CB_TOKEN_6001",
+         "roomTypeConfigs": [{"roomTypeID": "1", "roomTypeName": "Suite", "roomTypeUnits": 10, "percentage": 50}]}
+      ]
+    }
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import main
+
+
+def print_plan_summary(plan):
+    """Human-readable occupancy and stay-length summary of a dry-run plan"""
+    print("=" * 60)
+    print("RESERVATION PLAN (dry run - nothing was sent)")
+    print("=" * 60)
+    if plan['dates']:
+        print(f"Date range: {plan['dates'][0]} .. {plan['dates'][-1]} ({len(plan['dates'])} nights)")
+
+    for room_type in plan['roomTypes']:
+        occupancy = room_type['occupancy']
+        print(f"\n{room_type['roomTypeName']} ({room_type['roomTypeUnits']} units, {room_type['percentage']}%)")
+        print(f"  Reservations: {room_type['reservations']} (expected {room_type['expectedReservations']}, "
+              f"mean stay {room_type['expectedStayNights']} nights)")
+        print(f"  Room-nights: {room_type['roomNights']}")
+        if occupancy:
+            print(f"  Rooms per night: {min(occupancy)}-{max(occupancy)} "
+                  f"(target {room_type['targetRoomsPerNight']:.1f})")
+
+        distribution = room_type['stayLengthDistribution']
+        largest = max(distribution.values(), default=0)
+        for nights, count in sorted(distribution.items(), key=lambda item: int(item[0])):
+            bar = '#' * max(1, round(40 * count / largest))
+            print(f"  {nights:>2}n {count:>7} {bar}")
+
+    summary = plan['summary']
+    print(f"\nTotal reservations: {summary['total_reservations']}")
+    if summary['total_room_stays'] != summary['total_reservations']:
+        print(f"Total room-stays: {summary['total_room_stays']}")
+    print(f"Total room-nights: {summary['total_room_nights']}")
+    print(f"Planned in {summary['planning_seconds']}s")
+    print("=" * 60)
+
+
+def cmd_plan(args):
+    with open(args.fill_file) as f:
+        data = json.load(f)
+
+    if not data.get('startDate') or not data.get('endDate'):
+        print("Error: startDate and endDate are required", file=sys.stderr)
+        return 1
+
+    plan = main.run_dry_run(data, data.get('propertyID'), args.include_reservations)
+    print_plan_summary(plan)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(plan, f)
+        print(f"Plan written to {args.output}")
+    return 0
+
+
+def resolve_property_request(defaults, prop):
+    """Merge manifest defaults into one property's fill request and credentials"""
+    data = dict(defaults)
+    data.update({k: v for k, v in prop.items() if k not in ('accessToken', 'accessTokenEnv', 'percentage')})
+
+    token = prop.get('accessToken')
+    if not token and prop.get('accessTokenEnv'):
+        token = os.environ.get(prop['accessTokenEnv'])
+    if not token:
+        raise ValueError("no access token (set accessToken or accessTokenEnv)")
+    if not data.get('startDate') or not data.get('endDate'):
+        raise ValueError("startDate and endDate are required")
+
+    credentials = {'access_token': token, 'property_id': str(prop['propertyID'])}
+
+    if not data.get('roomTypeConfigs'):
+        percentage = prop.get('percentage', defaults.get('percentage'))
+        if percentage is None:
+            raise ValueError("roomTypeConfigs or percentage is required")
+        response = main.get_room_types_response(credentials)
+        if not response['success']:
+            raise ValueError(f"could not load room types: {response['error']}")
+        data['roomTypeConfigs'] = [dict(rt, percentage=percentage)
+                                   for rt in main.extract_room_types(response['data'])]
+    return credentials, data
+
+
+def fill_property(defaults, prop):
+    """Run one property's fill to completion; returns its summary record"""
+    record = {'propertyID': str(prop.get('propertyID')), 'status': 'failed'}
+    started = time.monotonic()
+    try:
+        credentials, data = resolve_property_request(defaults, prop)
+        settings_error = main.dispatch_settings_error(data)
+        if settings_error:
+            raise ValueError(settings_error)
+        # Each property runs as its own job, so it gets its own rate limiter
+        job = main.FillJob()
+        record['job_id'] = job.id
+        result = main.run_reservation_fill(job, credentials, data)
+        record['status'] = 'completed'
+        record['summary'] = result['summary']
+        record['results'] = result['results']
+    except Exception as e:
+        record['error'] = str(e)
+        print(f"✗ Property {record['propertyID']} failed: {e}", flush=True)
+    record['elapsed_seconds'] = round(time.monotonic() - started, 2)
+    return record
+
+
+def cmd_fill(args):
+    with open(args.manifest) as f:
+        manifest = json.load(f)
+
+    defaults = manifest.get('defaults', {})
+    properties = manifest.get('properties', [])
+    if not properties:
+        print("Error: manifest has no properties", file=sys.stderr)
+        return 1
+
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=max(1, args.parallel)) as executor:
+        records = list(executor.map(lambda prop: fill_property(defaults, prop), properties))
+
+    summary = {
+        'properties': records,
+        'totals': {
+            'properties': len(records),
+            'failed_properties': sum(1 for r in records if r['status'] != 'completed'),
+            'total_created': sum(r.get('summary', {}).get('total_created', 0) for r in records),
+            'total_errors': sum(r.get('summary', {}).get('total_errors', 0) for r in records),
+            'elapsed_seconds': round(time.monotonic() - started, 2)
+        }
+    }
+
+    print("=" * 60)
+    print("BATCH FILL SUMMARY")
+    print("=" * 60)
+    for record in records:
+        if record['status'] == 'completed':
+            print(f"  {record['propertyID']}: {record['summary']['total_created']} created, "
+                  f"{record['summary']['total_errors']} errors ({record['elapsed_seconds']}s)")
+        else:
+            print(f"  {record['propertyID']}: FAILED - {record.get('error')}")
+    totals = summary['totals']
+    print(f"Total: {totals['total_created']} created, {totals['total_errors']} errors, "
+          f"{totals['failed_properties']} failed properties in {totals['elapsed_seconds']}s")
+    print("=" * 60)
+
+    if args.summary:
+        with open(args.summary, 'w') as f:
+            json.dump(summary, f, indent=2)
+        print(f"Summary written to {args.summary}")
+
+    return 1 if totals['failed_properties'] else 0
+
+
+def cmd_cleanup(args):
+    token = os.environ.get(args.access_token_env)
+    if not token:
+        print(f"Error: set {args.access_token_env} to the property's access token", file=sys.stderr)
+        return 1
+
+    credentials = {'access_token': token, 'property_id': str(args.property_id)}
+    data = {
+        'source': args.source,
+        'jobId': args.job_id,
+        'prefix': args.prefix,
+        'startDate': args.start_date,
+        'endDate': args.end_date,
+        'maxWorkers': args.workers,
+        'requestsPerSecond': args.rps
+    }
+    settings_error = main.dispatch_settings_error(data)
+    if settings_error:
+        print(f"Error: {settings_error}", file=sys.stderr)
+        return 1
+    result = main.run_reservation_cleanup(main.FillJob(), credentials, data)
+
+    summary = result['summary']
+    for error in result['errors']:
+        print(f"  ✗ {error['count']} × {error['message']}")
+    print(f"Cancelled {summary['total_cancelled']} of {summary['total_found']} reservations, "
+          f"{summary['total_errors']} errors")
+    return 1 if summary['total_errors'] else 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Cloudbeds Reservation Creator command-line tools")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    plan_parser = subparsers.add_parser('plan', help="Generate a reservation plan without calling the API")
+    plan_parser.add_argument('fill_file', help="JSON fill request (same body as /api/create-reservations)")
+    plan_parser.add_argument('--output', '-o', help="Write the full plan as JSON to this file")
+    plan_parser.add_argument('--include-reservations', action='store_true',
+                             help="Include every generated reservation body in the JSON output")
+    plan_parser.set_defaults(func=cmd_plan)
+
+    fill_parser = subparsers.add_parser('fill', help="Create reservations for every property in a manifest")
+    fill_parser.add_argument('manifest', help="JSON manifest of properties to fill")
+    fill_parser.add_argument('--parallel', '-p', type=int, default=4, help="Properties to fill at the same time")
+    fill_parser.add_argument('--summary', '-s', help="Write a machine-readable JSON summary to this file")
+    fill_parser.set_defaults(func=cmd_fill)
+
+    cleanup_parser = subparsers.add_parser('cleanup', help="Cancel reservations created by earlier fills")
+    cleanup_parser.add_argument('--property-id', required=True)
+    cleanup_parser.add_argument('--access-token-env', default='CLOUDBEDS_ACCESS_TOKEN',
+                                help="Environment variable holding the access token")
+    cleanup_parser.add_argument('--source', choices=('journal', 'api'), default='journal',
+                                help="Find targets in the local journal or by scanning getReservations")
+    cleanup_parser.add_argument('--job-id', help="Only clean up this fill job (journal source)")
+    cleanup_parser.add_argument('--prefix', default=main.DEMO_ID_PREFIX,
+                                help="thirdPartyIdentifier prefix to match (api source)")
+    cleanup_parser.add_argument('--start-date', help="Earliest check-in date to scan (api source)")
+    cleanup_parser.add_argument('--end-date', help="Latest check-in date to scan (api source)")
+    cleanup_parser.add_argument('--workers', type=int, default=None)
+    cleanup_parser.add_argument('--rps', type=float, default=None, help="Requests per second")
+    cleanup_parser.set_defaults(func=cmd_cleanup)
+
+    return parser
+
+
+if __name__ == '__main__':
+    args = build_parser().parse_args()
+    sys.exit(args.func(args))
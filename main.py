@@ -1,16 +1,103 @@
 #!/usr/bin/env python3
 
 import os
+import sys
 import json
 import requests
+import aiohttp
 import random
 import string
 import time
+import threading
+import uuid
+import hashlib
+import itertools
+import asyncio
+import ssl
+import urllib.parse
+import secrets
+import queue
+import sqlite3
+import atexit
+import bisect
+import math
+import contextlib
+import functools
+import logging
+import logging.handlers
+from collections import Counter, deque, OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from datetime import datetime, timedelta
-from flask import Flask, render_template, request, jsonify, session
+from flask import Flask, render_template, request, jsonify, session, Response
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 app = Flask(__name__)
 
+# Logging: records are handed to a queue and written to stdout by a listener
+# thread, so dispatch workers never block on console I/O.
+# LOG_LEVEL: DEBUG/INFO/WARNING/ERROR; LOG_FORMAT: text or json
+# LOG_SAMPLE_EVERY: log one in N successful reservations (failures always logged)
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+LOG_FORMAT = os.environ.get('LOG_FORMAT', 'text').lower()
+LOG_SAMPLE_EVERY = max(1, int(os.environ.get('LOG_SAMPLE_EVERY', 10)))
+
+# Attributes every LogRecord has; anything else came from extra={...}
+_LOG_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+
+class JsonLogFormatter(logging.Formatter):
+    """One JSON object per line, including any extra={...} fields"""
+
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage()
+        }
+        entry.update({k: v for k, v in vars(record).items() if k not in _LOG_RECORD_ATTRS})
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+class SamplingFilter(logging.Filter):
+    """Pass one in every N records below WARNING; warnings and errors always pass"""
+
+    def __init__(self, every):
+        super().__init__()
+        self.every = every
+        self.counter = itertools.count()
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING or self.every <= 1:
+            return True
+        return next(self.counter) % self.every == 0
+
+def configure_logging():
+    """Route the app's loggers through a queue to a single stdout handler"""
+    stream_handler = logging.StreamHandler(sys.stdout)
+    if LOG_FORMAT == 'json':
+        stream_handler.setFormatter(JsonLogFormatter())
+    else:
+        stream_handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)-7s %(message)s'))
+
+    log_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, stream_handler)
+    listener.start()
+    atexit.register(listener.stop)
+
+    logger = logging.getLogger('reservation_filler')
+    logger.setLevel(LOG_LEVEL)
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    logger.propagate = False
+
+    # Per-reservation outcome lines are sampled so large fills don't flood the logs
+    logging.getLogger('reservation_filler.reservations').addFilter(SamplingFilter(LOG_SAMPLE_EVERY))
+    return logger
+
+log = configure_logging()
+reservation_log = logging.getLogger('reservation_filler.reservations')
+
 # SECURITY: Secret key for session encryption
 # PRODUCTION: Set SECRET_KEY environment variable
 # DEVELOPMENT: Uses default below (CHANGE THIS in production!)
@@ -19,14 +106,10 @@ app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', DEFAULT_DEV_KEY)
 
 # Warn if using default key
 if not os.environ.get('SECRET_KEY'):
-    print("\n" + "!"*60)
-    print("WARNING: Using default SECRET_KEY for development only!")
-    print("PRODUCTION: Set SECRET_KEY environment variable")
-    print("!"*60 + "\n")
+    log.warning("Using default SECRET_KEY for development only! "
+                "PRODUCTION: Set SECRET_KEY environment variable")
 
 app.config['SEND_FILE_MAX_AGE_DEFAULT'] = 0
-# Allow longer response times for bulk reservation creation
-app.config['TIMEOUT'] = 3600  # 1 hour timeout
 # Session configuration
 app.config['SESSION_TYPE'] = 'filesystem'
 app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(days=7)
@@ -39,209 +122,2477 @@ def get_credentials():
     }
 
 # API URLs
-ROOM_TYPES_URL = "https://api.cloudbeds.com/api/v1.3/getRoomTypes"
-POST_RESERVATION_URL = "https://api.cloudbeds.com/api/v1.3/postReservation"
-GET_SOURCES_URL = "https://api.cloudbeds.com/api/v1.3/getSources"
+# CLOUDBEDS_API_BASE can point at mock_cloudbeds.py for offline testing
+API_BASE_URL = os.environ.get('CLOUDBEDS_API_BASE', 'https://api.cloudbeds.com/api/v1.3').rstrip('/')
+ROOM_TYPES_URL = f"{API_BASE_URL}/getRoomTypes"
+POST_RESERVATION_URL = f"{API_BASE_URL}/postReservation"
+GET_SOURCES_URL = f"{API_BASE_URL}/getSources"
+GET_RESERVATIONS_URL = f"{API_BASE_URL}/getReservations"
+PUT_RESERVATION_URL = f"{API_BASE_URL}/putReservation"
+GET_AVAILABLE_ROOM_TYPES_URL = f"{API_BASE_URL}/getAvailableRoomTypes"
+
+# getReservations returns at most 100 reservations per page
+RESERVATIONS_PAGE_SIZE = 100
+
+# Concurrency / rate limiting defaults for postReservation dispatch
+# Override with environment variables or per-request in the JSON body
+DEFAULT_MAX_WORKERS = int(os.environ.get('CLOUDBEDS_MAX_WORKERS', 4))
+DEFAULT_REQUESTS_PER_SECOND = float(os.environ.get('CLOUDBEDS_REQUESTS_PER_SECOND', 5))
+DEFAULT_BURST = int(os.environ.get('CLOUDBEDS_BURST', 5))
+
+# Pooled keep-alive HTTP sessions, one per credential set
+# Pool size should be at least the number of dispatch workers
+HTTP_POOL_SIZE = int(os.environ.get('CLOUDBEDS_POOL_SIZE', max(DEFAULT_MAX_WORKERS, 10)))
+HTTP_CONNECT_RETRIES = int(os.environ.get('CLOUDBEDS_CONNECT_RETRIES', 2))
+HTTP_MAX_SESSIONS = 32
+
+# asyncio dispatch: in-flight calls per job and open connections per process
+DEFAULT_MAX_IN_FLIGHT = int(os.environ.get('CLOUDBEDS_MAX_IN_FLIGHT', 100))
+ASYNC_POOL_SIZE = int(os.environ.get('CLOUDBEDS_ASYNC_POOL_SIZE', 100))
+
+# Number of progress events kept per job for /api/jobs/<id>/events clients
+JOB_EVENT_BUFFER_SIZE = int(os.environ.get('JOB_EVENT_BUFFER_SIZE', 1000))
+
+# Progress streams are bounded long-polls: a response waits up to
+# JOB_EVENT_POLL_SECONDS for new events, then ends and the browser reconnects
+# with Last-Event-ID after JOB_EVENT_RETRY_MS. At most JOB_EVENT_MAX_WAITING
+# responses wait at once, so open progress tabs never hold every web thread.
+JOB_EVENT_POLL_SECONDS = float(os.environ.get('JOB_EVENT_POLL_SECONDS', 10))
+JOB_EVENT_RETRY_MS = int(os.environ.get('JOB_EVENT_RETRY_MS', 1000))
+JOB_EVENT_MAX_WAITING = int(os.environ.get('JOB_EVENT_MAX_WAITING', 4))
+
+# Opt-in fill profiling: stack-sampling interval and how many of the most
+# frequent sampled stacks a job result keeps
+PROFILE_SAMPLE_INTERVAL = float(os.environ.get('FILL_PROFILE_SAMPLE_INTERVAL_MS', 10)) / 1000
+PROFILE_TOP_STACKS = int(os.environ.get('FILL_PROFILE_TOP_STACKS', 50))
+
+# Largest plan a dryRun request may ask for: nights x planned units, and
+# reservations returned with includeReservations (the CLI has no limit)
+DRY_RUN_MAX_ROOM_NIGHTS = int(os.environ.get('FILL_DRY_RUN_MAX_ROOM_NIGHTS', 1000000))
+DRY_RUN_MAX_RESERVATIONS = int(os.environ.get('FILL_DRY_RUN_MAX_RESERVATIONS', 10000))
+
+# Nights per getAvailableRoomTypes call in the availability pre-flight
+PREFLIGHT_CHUNK_NIGHTS = max(1, int(os.environ.get('FILL_PREFLIGHT_CHUNK_NIGHTS', 14)))
+
+# Append-only journal of planned reservations and outcomes, used to resume
+# interrupted fill jobs without double-booking
+FILL_JOURNAL_PATH = os.environ.get('FILL_JOURNAL_PATH', 'fill_journal.db')
+
+# Per-credential cache for getSources / getRoomTypes responses
+# Set CLOUDBEDS_CACHE_PATH to share entries across gunicorn workers via SQLite
+API_CACHE_TTL = float(os.environ.get('CLOUDBEDS_CACHE_TTL', 300))
+API_CACHE_MAXSIZE = int(os.environ.get('CLOUDBEDS_CACHE_MAXSIZE', 256))
+API_CACHE_PATH = os.environ.get('CLOUDBEDS_CACHE_PATH')
+
+class MetricsRegistry:
+    """Minimal thread-safe metrics store rendered in the Prometheus text format"""
+
+    DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.meta = {}        # name -> (type, help text)
+        self.buckets = {}     # histogram name -> upper bounds
+        self.samples = {}     # (name, labels) -> counter value or histogram state
+        self.callbacks = {}   # gauge name -> callable returning [(labels dict, value)]
+
+    def counter(self, name, help_text):
+        self.meta[name] = ('counter', help_text)
+
+    def histogram(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        self.meta[name] = ('histogram', help_text)
+        self.buckets[name] = tuple(buckets)
+
+    def gauge(self, name, help_text, callback):
+        """Gauges are read on scrape, so they never go stale"""
+        self.meta[name] = ('gauge', help_text)
+        self.callbacks[name] = callback
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.samples[key] = self.samples.get(key, 0) + amount
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        buckets = self.buckets[name]
+        with self.lock:
+            state = self.samples.get(key)
+            if state is None:
+                # Per-bucket counts (last one is +Inf), then the running sum
+                state = self.samples[key] = [0] * (len(buckets) + 1) + [0.0]
+            state[bisect.bisect_left(buckets, value)] += 1
+            state[-1] += value
+
+    @staticmethod
+    def _labels(labels):
+        if not labels:
+            return ''
+        return '{' + ','.join(
+            f'{k}="' + str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+            for k, v in labels
+        ) + '}'
+
+    def render(self):
+        with self.lock:
+            samples = sorted(self.samples.items(), key=lambda item: item[0])
+            samples = [(key, list(state) if isinstance(state, list) else state) for key, state in samples]
+
+        lines = []
+        for name, (metric_type, help_text) in self.meta.items():
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {metric_type}')
+            if metric_type == 'gauge':
+                for labels, value in self.callbacks[name]():
+                    lines.append(f'{name}{self._labels(sorted(labels.items()))} {value}')
+                continue
+            for (sample_name, labels), state in samples:
+                if sample_name != name:
+                    continue
+                if metric_type == 'counter':
+                    lines.append(f'{name}{self._labels(labels)} {state}')
+                    continue
+                cumulative = 0
+                for bound, count in zip(self.buckets[name] + ('+Inf',), state):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{self._labels(labels + (("le", bound),))} {cumulative}')
+                lines.append(f'{name}_sum{self._labels(labels)} {state[-1]}')
+                lines.append(f'{name}_count{self._labels(labels)} {cumulative}')
+        return '\n'.join(lines) + '\n'
+
+metrics = MetricsRegistry()
+metrics.histogram('cloudbeds_api_request_duration_seconds',
+                  'Cloudbeds API attempt latency by endpoint and HTTP status (or timeout/connection_error)')
+metrics.counter('cloudbeds_api_retries_total', 'Cloudbeds API attempts retried, by endpoint')
+metrics.counter('cloudbeds_api_timeouts_total', 'Cloudbeds API attempts that timed out, by endpoint')
+metrics.counter('cloudbeds_reservations_total', 'Room-stays processed by fill jobs, by room type and outcome')
+metrics.counter('cloudbeds_cleanup_reservations_total', 'Reservations processed by cleanup jobs, by outcome')
+metrics.counter('cloudbeds_duplicate_checks_total',
+                'Existence checks before resending a reservation, by outcome (found, absent, error)')
+metrics.counter('cloudbeds_rate_limiter_wait_seconds_total', 'Time dispatch workers spent waiting for rate-limit tokens')
+
+class PhaseTimer:
+    """Thread-safe wall and CPU time totals per named phase of one fill job
+
+    Phases awaited on the event loop record wall time only.
+    """
+
+    # Where a worker's time goes while it dispatches one call
+    API_PHASES = ('http_wait', 'retry_backoff', 'circuit_breaker_wait', 'duplicate_check')
+    THROTTLE_PHASES = ('rate_limit_wait', 'call_slot_wait')
+    # Work the job thread does itself, before and during dispatch
+    SETUP_PHASES = ('planning', 'preflight', 'plan_journal', 'journal_load')
+    JOB_THREAD_PHASES = ('payload_generation', 'result_logging')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.totals = {}  # phase -> [calls, wall seconds, cpu seconds or None]
+        self.started = time.perf_counter()
+        self.cpu_started = time.process_time()
+
+    def record(self, name, wall, cpu=None):
+        with self.lock:
+            totals = self.totals.get(name)
+            if totals is None:
+                totals = self.totals[name] = [0, 0.0, None if cpu is None else 0.0]
+            totals[0] += 1
+            totals[1] += wall
+            if cpu is not None and totals[2] is not None:
+                totals[2] += cpu
+
+    @contextlib.contextmanager
+    def phase(self, name, cpu=True):
+        wall_started = time.perf_counter()
+        cpu_started = time.thread_time() if cpu else None
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - wall_started,
+                        time.thread_time() - cpu_started if cpu else None)
+
+    def iterate(self, name, items):
+        """Yield from items, timing each step as one call of phase name"""
+        items = iter(items)
+        while True:
+            with self.phase(name):
+                item = next(items, _EXHAUSTED)
+            if item is _EXHAUSTED:
+                return
+            yield item
+
+    def seconds(self, *names):
+        with self.lock:
+            return sum(self.totals[name][1] for name in names if name in self.totals)
+
+    def bottleneck(self):
+        """'overhead', 'rate_limiter' or 'api': what most likely set the job's pace"""
+        total = time.perf_counter() - self.started
+        if total > 0 and self.seconds(*self.SETUP_PHASES) > total / 2:
+            return 'overhead'
+        dispatch_seconds = self.seconds('dispatch')
+        if dispatch_seconds > 0 and self.seconds(*self.JOB_THREAD_PHASES) > 0.8 * dispatch_seconds:
+            return 'overhead'
+        return 'rate_limiter' if self.seconds(*self.THROTTLE_PHASES) > self.seconds(*self.API_PHASES) else 'api'
+
+    def report(self):
+        with self.lock:
+            phases = {name: {'calls': calls, 'wall_seconds': round(wall, 4),
+                             'cpu_seconds': None if cpu is None else round(cpu, 4)}
+                      for name, (calls, wall, cpu) in self.totals.items()}
+        return {
+            'wall_seconds': round(time.perf_counter() - self.started, 3),
+            'process_cpu_seconds': round(time.process_time() - self.cpu_started, 3),
+            'bottleneck': self.bottleneck(),
+            'phases': phases
+        }
+
+_NO_PHASE = contextlib.nullcontext()
+
+def timed(profiler, name, cpu=True):
+    """profiler.phase(name), or a no-op context when profiling is off"""
+    return profiler.phase(name, cpu) if profiler is not None else _NO_PHASE
+
+class StackSampler:
+    """Background sampling profiler over the threads include(thread) accepts, counted as folded stacks"""
+
+    MAX_DEPTH = 64
+
+    def __init__(self, include, interval=PROFILE_SAMPLE_INTERVAL):
+        self.include = include
+        self.interval = max(interval, 0.001)
+        self.stacks = Counter()
+        self.samples = 0
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
 
-# Cache for sources to avoid repeated API calls
-_cached_sources = None
+    def stop(self):
+        self.stop_event.set()
+        self.thread.join()
+
+    def _run(self):
+        while not self.stop_event.wait(self.interval):
+            frames = sys._current_frames()
+            self.samples += 1
+            for thread in threading.enumerate():
+                frame = frames.get(thread.ident)
+                if frame is None or not self.include(thread):
+                    continue
+                names = []
+                while frame is not None and len(names) < self.MAX_DEPTH:
+                    code = frame.f_code
+                    names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                names.append(thread.name)
+                self.stacks[';'.join(reversed(names))] += 1
+
+    def report(self, top=PROFILE_TOP_STACKS):
+        return {
+            'interval_ms': round(self.interval * 1000, 3),
+            'samples': self.samples,
+            'distinct_stacks': len(self.stacks),
+            'stacks': [{'stack': stack, 'count': count} for stack, count in self.stacks.most_common(top)]
+        }
+
+class TokenBucket:
+    """Thread-safe token-bucket rate limiter shared by all dispatch workers"""
+
+    def __init__(self, rate, burst):
+        self.rate = max(float(rate), 0.001)
+        self.capacity = max(float(burst), 1.0)
+        self.tokens = self.capacity
+        self.last_refill = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self.last_refill
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+        self.last_refill = now
+
+    def _take(self, tokens):
+        """Consume `tokens` and return 0, or return the seconds to wait before trying again"""
+        with self.lock:
+            self._refill()
+            if self.tokens >= tokens:
+                self.tokens -= tokens
+                return 0
+            wait = (tokens - self.tokens) / self.rate
+        metrics.inc('cloudbeds_rate_limiter_wait_seconds_total', wait)
+        return wait
+
+    def acquire(self, tokens=1):
+        """Block until `tokens` are available, then consume them"""
+        while True:
+            wait = self._take(tokens)
+            if not wait:
+                return
+            time.sleep(wait)
+
+    async def acquire_async(self, tokens=1):
+        """acquire() for coroutines: waits without blocking the event loop"""
+        while True:
+            wait = self._take(tokens)
+            if not wait:
+                return
+            await asyncio.sleep(wait)
+
+    def available(self):
+        with self.lock:
+            self._refill()
+            return self.tokens
+
+class TTLCache:
+    """Thread-safe LRU cache with per-entry expiry and single-flight loading
+
+    With backend_path set, entries are shared with other gunicorn workers through SQLite.
+    """
+
+    def __init__(self, maxsize, ttl, backend_path=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.backend_path = backend_path
+        self.entries = OrderedDict()
+        self.in_flight = {}
+        self.lock = threading.Lock()
+        if backend_path:
+            with self._connect() as conn:
+                conn.execute('CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value_json TEXT NOT NULL, '
+                             'expires_at REAL NOT NULL)')
+
+    def _connect(self):
+        conn = sqlite3.connect(self.backend_path, timeout=5)
+        conn.execute('PRAGMA journal_mode=WAL')
+        return conn
+
+    def _backend_get(self, key):
+        try:
+            with self._connect() as conn:
+                row = conn.execute('SELECT value_json, expires_at FROM cache WHERE key = ?', (key,)).fetchone()
+        except sqlite3.Error as e:
+            log.warning("Cache backend read failed: %s", e)
+            return None
+        if row and row[1] > time.time():
+            return json.loads(row[0]), row[1]
+        return None
+
+    def _backend_set(self, key, value, expires_at):
+        try:
+            with self._connect() as conn:
+                conn.execute('INSERT OR REPLACE INTO cache (key, value_json, expires_at) VALUES (?, ?, ?)',
+                             (key, json.dumps(value), expires_at))
+                conn.execute('DELETE FROM cache WHERE expires_at < ?', (time.time(),))
+        except sqlite3.Error as e:
+            log.warning("Cache backend write failed: %s", e)
+
+    def _store(self, key, value, expires_at):
+        self.entries[key] = (value, expires_at)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def get_or_load(self, key, loader):
+        """Return the cached value for key, calling loader() on a miss
+
+        loader returns (value, cacheable); uncacheable values (errors,
+        fallbacks) are handed to every waiting caller but not stored.
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry and entry[1] > time.time():
+                self.entries.move_to_end(key)
+                return entry[0]
+            waiter = self.in_flight.get(key)
+            leader = waiter is None
+            if leader:
+                waiter = {'event': threading.Event(), 'value': None}
+                self.in_flight[key] = waiter
+
+        if not leader:
+            # Another thread is already loading this key - share its result
+            waiter['event'].wait()
+            if waiter['value'] is None:
+                # The leader's loader raised - try loading ourselves
+                return self.get_or_load(key, loader)
+            return waiter['value']
+
+        try:
+            shared = self._backend_get(key) if self.backend_path else None
+            if shared:
+                value, expires_at = shared
+                with self.lock:
+                    self._store(key, value, expires_at)
+            else:
+                value, cacheable = loader()
+                if cacheable:
+                    expires_at = time.time() + self.ttl
+                    with self.lock:
+                        self._store(key, value, expires_at)
+                    if self.backend_path:
+                        self._backend_set(key, value, expires_at)
+            waiter['value'] = value
+            return value
+        finally:
+            with self.lock:
+                self.in_flight.pop(key, None)
+            waiter['event'].set()
+
+    def invalidate(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+        if self.backend_path:
+            try:
+                with self._connect() as conn:
+                    conn.execute('DELETE FROM cache WHERE key = ?', (key,))
+            except sqlite3.Error as e:
+                log.warning("Cache backend delete failed: %s", e)
+
+api_cache = TTLCache(API_CACHE_MAXSIZE, API_CACHE_TTL, API_CACHE_PATH)
+
+def api_cache_key(kind, credentials):
+    return ':'.join((kind,) + credentials_key(credentials))
 
 def get_available_sources(credentials):
-    """Fetch available sources from the API and cache them"""
-    global _cached_sources
+    """Return the sourceID to use for this credential set, cached with a TTL"""
+    return api_cache.get_or_load(api_cache_key('sources', credentials), lambda: _fetch_source_id(credentials))
 
-    if _cached_sources is not None:
-        print(f"Using cached source: {_cached_sources}", flush=True)
-        return _cached_sources
+def get_room_types_response(credentials, refresh=False):
+    """getRoomTypes through the cache; only successful responses are cached"""
+    key = api_cache_key('room_types', credentials)
+    if refresh:
+        api_cache.invalidate(key)
 
+    def load():
+        result = make_api_call(ROOM_TYPES_URL, {'propertyID': credentials['property_id']}, credentials)
+        return result, result['success']
+
+    return api_cache.get_or_load(key, load)
+
+def extract_room_types(data):
+    """Reduce a getRoomTypes payload to the fields the app uses"""
+    room_types = []
+
+    if isinstance(data, dict) and 'data' in data:
+        room_types = data['data']
+    elif isinstance(data, list):
+        room_types = data
+
+    # Process room types to extract needed fields
+    processed_room_types = []
+    for rt in room_types:
+        if rt:
+            processed_room_types.append({
+                'roomTypeID': rt.get('roomTypeID'),
+                'roomTypeName': rt.get('roomTypeName'),
+                'roomTypeUnits': rt.get('roomTypeUnits', 0),
+                'maxGuests': rt.get('maxGuests', 1)
+            })
+    return processed_room_types
+
+def _fetch_source_id(credentials):
+    """Fetch available sources from the API; returns (source_id, cacheable)"""
     try:
-        print("=" * 60, flush=True)
-        print("FETCHING AVAILABLE SOURCES FROM API", flush=True)
-        print("=" * 60, flush=True)
+        log.info("Fetching available sources from API")
         result = make_api_call(GET_SOURCES_URL, {'propertyID': credentials['property_id']}, credentials)
 
-        print(f"DEBUG - getSources API result success: {result.get('success')}", flush=True)
-        print(f"DEBUG - getSources API result keys: {result.keys()}", flush=True)
-        print(f"DEBUG - getSources API full response: {json.dumps(result, indent=2)}", flush=True)
+        # Full payload dumps are expensive; only build them when DEBUG is on
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("getSources API full response: %s", json.dumps(result, indent=2))
 
         if result['success'] and 'data' in result:
             sources = result['data']
-            print(f"DEBUG - Sources data type: {type(sources)}", flush=True)
-            print(f"DEBUG - Sources data: {json.dumps(sources, indent=2)}", flush=True)
+            # The API wraps the list as {"success": true, "data": [...]}
+            if isinstance(sources, dict):
+                sources = sources.get('data', [])
 
             if sources and len(sources) > 0:
-                print(f"DEBUG - Found {len(sources)} available sources", flush=True)
-
-                # List all available sources
-                print("\nAVAILABLE SOURCES:", flush=True)
-                for idx, source in enumerate(sources):
-                    print(f"  {idx+1}. ID: {source.get('sourceID')} - Name: {source.get('sourceName', 'Unknown')}", flush=True)
+                log.debug("Found %d available sources: %s", len(sources),
+                          ', '.join(f"{source.get('sourceID')} ({source.get('sourceName', 'Unknown')})" for source in sources))
 
                 # Return the first source ID or a preferred one
                 for source in sources:
                     if source.get('sourceID'):
                         selected_source = source.get('sourceID')
-                        _cached_sources = selected_source
-                        print(f"\n✓ SELECTED SOURCE: {selected_source} - {source.get('sourceName', 'Unknown')}", flush=True)
-                        print("=" * 60, flush=True)
-                        return selected_source
+                        log.info("Selected source: %s - %s", selected_source, source.get('sourceName', 'Unknown'))
+                        return selected_source, True
             else:
-                print("WARNING - Sources data is empty or has 0 length", flush=True)
+                log.warning("Sources data is empty or has 0 length")
         else:
-            print(f"WARNING - API call failed or no data. Success: {result.get('success')}, Has 'data': {'data' in result}", flush=True)
+            log.warning("getSources call failed or returned no data. Success: %s, Has 'data': %s",
+                        result.get('success'), 'data' in result)
 
         # Fallback to the known working source ID
-        print("\nWARNING: No sources found in API response", flush=True)
-        print("Using fallback source ID: 'ss-123298-1'", flush=True)
-        print("=" * 60, flush=True)
-        _cached_sources = 'ss-123298-1'
-        return 'ss-123298-1'
+        log.warning("No sources found in API response, using fallback source ID: 'ss-123298-1'")
+        return 'ss-123298-1', False
 
-    except Exception as e:
-        print(f"\nERROR fetching sources: {e}", flush=True)
-        import traceback
-        traceback.print_exc()
+    except Exception:
         # Fallback to the known working source ID
-        print("Using fallback source ID due to error: 'ss-123298-1'", flush=True)
-        print("=" * 60, flush=True)
-        _cached_sources = 'ss-123298-1'
-        return 'ss-123298-1'
-
-def make_api_call(url, params, credentials, method='GET', data=None, use_form_data=False, retry_count=0, max_retries=2):
-    if use_form_data:
-        headers = {
+        log.exception("Error fetching sources, using fallback source ID: 'ss-123298-1'")
+        return 'ss-123298-1', False
+
+_api_sessions = OrderedDict()
+_api_sessions_lock = threading.Lock()
+
+def credentials_key(credentials):
+    """Cache key for a credential set that never holds the raw token"""
+    token_fingerprint = hashlib.sha256((credentials.get('access_token') or '').encode()).hexdigest()[:16]
+    return (str(credentials.get('property_id')), token_fingerprint)
+
+def credentials_owner(credentials):
+    """Owner tag for jobs started with these credentials, or None without an access token
+
+    Property ID plus token fingerprint: knowing a property ID (which anyone
+    can put in their session) is not enough to see or control its jobs.
+    """
+    if not credentials.get('access_token'):
+        return None
+    return ':'.join(credentials_key(credentials))
+
+def get_api_session(credentials):
+    """Return the shared pooled session for a credential set, creating it on first use"""
+    key = credentials_key(credentials)
+
+    with _api_sessions_lock:
+        api_session = _api_sessions.get(key)
+        if api_session is not None:
+            _api_sessions.move_to_end(key)
+            return api_session
+
+        api_session = requests.Session()
+        # Only connection failures are retried here: the request never reached
+        # the server, so this is safe for POSTs too
+        retry = Retry(total=HTTP_CONNECT_RETRIES, connect=HTTP_CONNECT_RETRIES, read=0, status=0,
+                      backoff_factor=0.5, raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=HTTP_POOL_SIZE, max_retries=retry)
+        api_session.mount('https://', adapter)
+        api_session.mount('http://', adapter)
+        api_session.headers.update({
             "Authorization": f"Bearer {credentials['access_token']}",
             "Accept": "application/json",
-            "Content-Type": "application/x-www-form-urlencoded",
             "Connection": "keep-alive"
-        }
-    else:
-        headers = {
-            "Authorization": f"Bearer {credentials['access_token']}",
-            "Accept": "application/json",
-            "Content-Type": "application/json",
-            "Connection": "keep-alive"
-        }
-
+        })
+        _api_sessions[key] = api_session
+
+        # Evict the least recently used sessions
+        while len(_api_sessions) > HTTP_MAX_SESSIONS:
+            _, old_session = _api_sessions.popitem(last=False)
+            old_session.close()
+
+        return api_session
+
+class RetryPolicy:
+    """Exponential backoff with full jitter and separate retry budgets for POSTs and idempotent calls"""
+
+    RETRYABLE_STATUS_CODES = (429, 500, 502, 503, 504)
+    # Responses (besides timeouts and dropped connections) that don't prove
+    # the server left the request unprocessed
+    AMBIGUOUS_STATUS_CODES = (500, 502, 504)
+
+    def __init__(self, get_retries=4, post_retries=2, base_delay=0.5, max_delay=30.0):
+        self.get_retries = get_retries
+        self.post_retries = post_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def budget(self, method):
+        return self.post_retries if method == 'POST' else self.get_retries
+
+    def delay(self, attempt, retry_after=None):
+        """Seconds to wait before retry number `attempt` (1-based)"""
+        if retry_after is not None:
+            return min(retry_after, self.max_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** (attempt - 1))))
+
+    @staticmethod
+    def parse_retry_after(response):
+        """Retry-After header as seconds (delta-seconds or HTTP-date form), or None"""
+        value = response.headers.get('Retry-After')
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            from email.utils import parsedate_to_datetime
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+DEFAULT_RETRY_POLICY = RetryPolicy(
+    get_retries=int(os.environ.get('CLOUDBEDS_GET_RETRIES', 4)),
+    post_retries=int(os.environ.get('CLOUDBEDS_POST_RETRIES', 2)),
+    base_delay=float(os.environ.get('CLOUDBEDS_RETRY_BASE_DELAY', 0.5)),
+    max_delay=float(os.environ.get('CLOUDBEDS_RETRY_MAX_DELAY', 30))
+)
+
+class CircuitBreaker:
+    """Pauses every caller sharing it once the API keeps shedding load (429/5xx)"""
+
+    def __init__(self, failure_threshold=5, cooldown=10.0):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self.lock = threading.Lock()
+
+    def remaining(self):
+        with self.lock:
+            return self.open_until - time.monotonic()
+
+    def wait_until_closed(self):
+        while True:
+            remaining = self.remaining()
+            if remaining <= 0:
+                return
+            time.sleep(remaining)
+
+    async def wait_until_closed_async(self):
+        while True:
+            remaining = self.remaining()
+            if remaining <= 0:
+                return
+            await asyncio.sleep(remaining)
+
+    def record_success(self):
+        with self.lock:
+            self.consecutive_failures = 0
+
+    def record_overload(self, retry_after=None):
+        with self.lock:
+            self.consecutive_failures += 1
+            pause = retry_after
+            if self.consecutive_failures >= self.failure_threshold:
+                pause = max(pause or 0.0, self.cooldown)
+            if pause:
+                if time.monotonic() + pause > self.open_until:
+                    log.warning("API is shedding load - pausing all calls for %.1fs", pause)
+                self.open_until = max(self.open_until, time.monotonic() + pause)
+
+def _classify_response(response, endpoint, started, retry_count, max_retries, circuit_breaker):
+    """Normalize one HTTP response: (result, retryable, retry_after, ambiguous)
+
+    Works on requests and AsyncResponse objects alike, so the sync and async
+    clients share the same success/error shapes and retry decisions.
+    """
+    metrics.observe('cloudbeds_api_request_duration_seconds', time.perf_counter() - started,
+                    endpoint=endpoint, status=str(response.status_code))
+
+    if response.status_code == 200 or response.status_code == 201:
+        if circuit_breaker is not None:
+            circuit_breaker.record_success()
+        return {'success': True, 'data': response.json(), 'retries': retry_count}, False, None, False
+
+    error_msg = f"HTTP {response.status_code}"
     try:
-        if method == 'GET':
-            response = requests.get(url, headers=headers, params=params, timeout=60)
+        error_data = response.json()
+        error_msg = error_data.get('message', error_msg)
+        log.debug("API error response: %s", error_data)
+    except ValueError:
+        log.debug("API error - no JSON response: %s", response.text)
+
+    failure = {'success': False, 'error': error_msg, 'retries': retry_count}
+    if response.status_code not in RetryPolicy.RETRYABLE_STATUS_CODES:
+        return failure, False, None, False
+
+    retry_after = RetryPolicy.parse_retry_after(response)
+    if circuit_breaker is not None:
+        circuit_breaker.record_overload(retry_after)
+    if retry_count >= max_retries:
+        log.warning("%s after %d retries", error_msg, max_retries)
+    else:
+        log.info("%s, retrying (%d/%d)", error_msg, retry_count + 1, max_retries)
+    return failure, True, retry_after, response.status_code in RetryPolicy.AMBIGUOUS_STATUS_CODES
+
+# Returned by a duplicate_check that could not find out whether the record exists
+DUPLICATE_CHECK_FAILED = object()
+
+def _checked_duplicate_result(existing, failure, endpoint, retry_count):
+    """Final result after a duplicate check, or None when the request may be resent"""
+    if existing is DUPLICATE_CHECK_FAILED:
+        # Resending could double-book; a resumed job reconciles this reservation later
+        log.warning("%s outcome unknown and the existence check failed - not resending", endpoint)
+        return dict(failure, error=f"{failure['error']} (outcome unknown: existence check failed, not resent)")
+    if existing is not None:
+        log.info("%s already exists server-side - not sending it again", endpoint)
+        return {'success': True, 'data': existing, 'retries': retry_count, 'deduplicated': True}
+    return None
+
+def _transport_failure(kind, endpoint, started, retry_count, max_retries):
+    """Record a timeout or dropped connection and build its failure result (always ambiguous)"""
+    metrics.observe('cloudbeds_api_request_duration_seconds', time.perf_counter() - started,
+                    endpoint=endpoint, status=kind)
+    if kind == 'timeout':
+        metrics.inc('cloudbeds_api_timeouts_total', endpoint=endpoint)
+        error = f"Request timed out after {max_retries} retries"
+        if retry_count >= max_retries:
+            log.warning("API call timed out after %d retries", max_retries)
         else:
-            if use_form_data:
-                response = requests.post(url, headers=headers, params=params, data=data, timeout=60)
-            else:
-                response = requests.post(url, headers=headers, params=params, json=data, timeout=60)
-
-        if response.status_code == 200 or response.status_code == 201:
-            data = response.json()
-            return {'success': True, 'data': data}
+            log.info("API call timed out, retrying (%d/%d)", retry_count + 1, max_retries)
+    else:
+        error = "Connection error - check your internet connection"
+        if retry_count >= max_retries:
+            log.warning("Connection error after %d retries", max_retries)
         else:
-            error_msg = f"HTTP {response.status_code}"
-            try:
-                error_data = response.json()
-                error_msg = error_data.get('message', error_msg)
-                print(f"API Error response: {error_data}", flush=True)
-            except:
-                print(f"API Error - no JSON response: {response.text}", flush=True)
-                pass
-            return {'success': False, 'error': error_msg}
-    except requests.exceptions.Timeout:
+            log.info("Connection error, retrying (%d/%d)", retry_count + 1, max_retries)
+    return {'success': False, 'error': error, 'retries': retry_count}
+
+def make_api_call(url, params, credentials, method='GET', data=None, use_form_data=False,
+                  max_retries=None, retry_policy=None, circuit_breaker=None, rate_limiter=None,
+                  duplicate_check=None, profiler=None):
+    """Call the Cloudbeds API and normalize the outcome to {'success', 'data'/'error', 'retries'}
+
+    duplicate_check runs after an attempt that may have reached the server and returns the
+    existing record, None or DUPLICATE_CHECK_FAILED; only None allows a resend.
+    """
+    if use_form_data:
+        headers = {"Content-Type": "application/x-www-form-urlencoded"}
+    else:
+        headers = {"Content-Type": "application/json"}
+
+    policy = retry_policy or DEFAULT_RETRY_POLICY
+    if max_retries is None:
+        max_retries = policy.budget(method)
+
+    api_session = get_api_session(credentials)
+    endpoint = url.rsplit('/', 1)[-1]
+    retry_count = 0
+
+    while True:
+        if circuit_breaker is not None:
+            with timed(profiler, 'circuit_breaker_wait'):
+                circuit_breaker.wait_until_closed()
+        # Every attempt, including retries, spends a rate-limit token
+        if rate_limiter is not None:
+            with timed(profiler, 'rate_limit_wait'):
+                rate_limiter.acquire()
+
+        retry_after = None
+        started = time.perf_counter()
+        try:
+            with timed(profiler, 'http_wait'):
+                if method == 'GET':
+                    response = api_session.get(url, headers=headers, params=params, timeout=60)
+                elif use_form_data:
+                    response = api_session.request(method, url, headers=headers, params=params, data=data,
+                                                   timeout=60)
+                else:
+                    response = api_session.request(method, url, headers=headers, params=params, json=data,
+                                                   timeout=60)
+            with timed(profiler, 'response_parsing'):
+                failure, retryable, retry_after, ambiguous = _classify_response(
+                    response, endpoint, started, retry_count, max_retries, circuit_breaker)
+            if not retryable:
+                return failure
+        except requests.exceptions.Timeout:
+            failure = _transport_failure('timeout', endpoint, started, retry_count, max_retries)
+            ambiguous = True
+        except requests.exceptions.ConnectionError:
+            failure = _transport_failure('connection_error', endpoint, started, retry_count, max_retries)
+            ambiguous = True
+        except Exception as e:
+            log.exception("Unexpected error calling %s", url)
+            return {'success': False, 'error': f"Connection error: {str(e)}", 'retries': retry_count}
+
         if retry_count < max_retries:
-            print(f"⚠ API call timed out, retrying ({retry_count + 1}/{max_retries})...", flush=True)
-            time.sleep(2)
-            return make_api_call(url, params, credentials, method, data, use_form_data, retry_count + 1, max_retries)
-        print(f"✗ API call timed out after {max_retries} retries", flush=True)
-        return {'success': False, 'error': f"Request timed out after {max_retries} retries"}
-    except requests.exceptions.ConnectionError as e:
+            with timed(profiler, 'retry_backoff', cpu=False):
+                time.sleep(policy.delay(retry_count + 1, retry_after))
+
+        # Never resend a request the server may already have acted on without checking first
+        if ambiguous and duplicate_check is not None:
+            with timed(profiler, 'duplicate_check'):
+                existing = duplicate_check()
+            checked = _checked_duplicate_result(existing, failure, endpoint, retry_count)
+            if checked is not None:
+                return checked
+
+        if retry_count >= max_retries:
+            return failure
+        retry_count += 1
+        metrics.inc('cloudbeds_api_retries_total', endpoint=endpoint)
+
+class AsyncResponse:
+    """The parts of a requests.Response that _classify_response reads"""
+
+    def __init__(self, status_code, headers, content):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8', errors='replace')
+
+    def json(self):
+        return json.loads(self.content)
+
+class AsyncHttpClient:
+    """aiohttp session with the proxies, CA bundle and connect retries of the requests sessions
+
+    Must be used from a single event loop.
+    """
+
+    def __init__(self, pool_size, connect_retries=0, timeout=60):
+        self.pool_size = pool_size
+        self.connect_retries = connect_retries
+        self.timeout = timeout
+        self.session = None  # created on the event loop at first use
+
+    def _new_session(self):
+        ca_bundle = os.environ.get('REQUESTS_CA_BUNDLE') or os.environ.get('CURL_CA_BUNDLE') or requests.certs.where()
+        return aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.pool_size, ssl=ssl.create_default_context(cafile=ca_bundle)),
+            # total also covers waiting for a pooled connection
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+            trust_env=True
+        )
+
+    async def request(self, method, url, headers, body=b''):
+        """Send one request and return an AsyncResponse
+
+        Raises asyncio.TimeoutError when the exchange takes longer than the
+        timeout and aiohttp.ClientError when the connection fails.
+        """
+        if self.session is None:
+            self.session = self._new_session()
+        for attempt in range(self.connect_retries + 1):
+            try:
+                async with self.session.request(method, url, headers=headers, data=body or None) as response:
+                    return AsyncResponse(response.status, response.headers, await response.read())
+            except aiohttp.ClientConnectorError:
+                if attempt == self.connect_retries:
+                    raise
+                await asyncio.sleep(0.5 * 2 ** attempt)
+
+class EventLoopThread:
+    """An asyncio event loop on its own daemon thread; submit() and run() hand it coroutines"""
+
+    def __init__(self, name='api-event-loop'):
+        self.loop = asyncio.new_event_loop()
+        self.http = AsyncHttpClient(ASYNC_POOL_SIZE, HTTP_CONNECT_RETRIES)
+        self.thread = threading.Thread(target=self.loop.run_forever, name=name, daemon=True)
+        self.thread.start()
+
+    def submit(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro, timeout=None):
+        return self.submit(coro).result(timeout)
+
+_event_loop_thread = None
+_event_loop_thread_lock = threading.Lock()
+
+def get_event_loop_thread():
+    """The process-wide API event loop, started on first use"""
+    global _event_loop_thread
+    with _event_loop_thread_lock:
+        if _event_loop_thread is None:
+            _event_loop_thread = EventLoopThread()
+        return _event_loop_thread
+
+async def make_api_call_async(url, params, credentials, method='GET', data=None, use_form_data=False,
+                              max_retries=None, retry_policy=None, circuit_breaker=None, rate_limiter=None,
+                              duplicate_check=None, profiler=None):
+    """make_api_call for coroutines on the API event loop
+
+    Same arguments, result shape and retry semantics; the waits (rate
+    limiter, circuit breaker, backoff) yield to the loop instead of
+    blocking a thread. duplicate_check is synchronous and runs on the
+    loop's default executor. Awaited phases are profiled by wall time only.
+    """
+    headers = {
+        "Authorization": f"Bearer {credentials['access_token']}",
+        "Accept": "application/json"
+    }
+    if data is None:
+        body = b''
+    elif use_form_data:
+        headers["Content-Type"] = "application/x-www-form-urlencoded"
+        body = urllib.parse.urlencode(data).encode()
+    else:
+        headers["Content-Type"] = "application/json"
+        body = json.dumps(data).encode()
+    if params:
+        url = f"{url}?{urllib.parse.urlencode(params)}"
+
+    policy = retry_policy or DEFAULT_RETRY_POLICY
+    if max_retries is None:
+        max_retries = policy.budget(method)
+
+    http = get_event_loop_thread().http
+    endpoint = url.split('?', 1)[0].rsplit('/', 1)[-1]
+    retry_count = 0
+
+    while True:
+        if circuit_breaker is not None:
+            with timed(profiler, 'circuit_breaker_wait', cpu=False):
+                await circuit_breaker.wait_until_closed_async()
+        # Every attempt, including retries, spends a rate-limit token
+        if rate_limiter is not None:
+            with timed(profiler, 'rate_limit_wait', cpu=False):
+                await rate_limiter.acquire_async()
+
+        retry_after = None
+        started = time.perf_counter()
+        try:
+            with timed(profiler, 'http_wait', cpu=False):
+                response = await http.request(method, url, headers, body)
+            with timed(profiler, 'response_parsing'):
+                failure, retryable, retry_after, ambiguous = _classify_response(
+                    response, endpoint, started, retry_count, max_retries, circuit_breaker)
+            if not retryable:
+                return failure
+        except asyncio.TimeoutError:
+            failure = _transport_failure('timeout', endpoint, started, retry_count, max_retries)
+            ambiguous = True
+        except aiohttp.ClientError:
+            failure = _transport_failure('connection_error', endpoint, started, retry_count, max_retries)
+            ambiguous = True
+        except Exception as e:
+            log.exception("Unexpected error calling %s", url)
+            return {'success': False, 'error': f"Connection error: {str(e)}", 'retries': retry_count}
+
         if retry_count < max_retries:
-            print(f"⚠ Connection error, retrying ({retry_count + 1}/{max_retries})...", flush=True)
-            time.sleep(2)
-            return make_api_call(url, params, credentials, method, data, use_form_data, retry_count + 1, max_retries)
-        print(f"✗ Connection error after {max_retries} retries", flush=True)
-        return {'success': False, 'error': "Connection error - check your internet connection"}
-    except Exception as e:
-        print(f"✗ Unexpected error: {e}", flush=True)
-        import traceback
-        traceback.print_exc()
-        return {'success': False, 'error': f"Connection error: {str(e)}"}
-
-def generate_random_name():
-    """Generate random first and last names"""
-    first_names = [
-        "James", "Mary", "John", "Patricia", "Robert", "Jennifer", "Michael", "Linda",
-        "William", "Elizabeth", "David", "Barbara", "Richard", "Susan", "Joseph", "Jessica",
-        "Thomas", "Sarah", "Christopher", "Karen", "Charles", "Nancy", "Daniel", "Lisa",
-        "Matthew", "Betty", "Anthony", "Helen", "Mark", "Sandra", "Donald", "Donna",
-        "Steven", "Carol", "Paul", "Ruth", "Andrew", "Sharon", "Kenneth", "Michelle",
-        "Joshua", "Laura", "Kevin", "Sarah", "Brian", "Kimberly", "George", "Deborah",
-        "Edward", "Dorothy", "Ronald", "Lisa", "Timothy", "Nancy", "Jason", "Karen"
-    ]
-    
-    last_names = [
-        "Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis",
-        "Rodriguez", "Martinez", "Hernandez", "Lopez", "Gonzalez", "Wilson", "Anderson", "Thomas",
-        "Taylor", "Moore", "Jackson", "Martin", "Lee", "Perez", "Thompson", "White",
-        "Harris", "Sanchez", "Clark", "Ramirez", "Lewis", "Robinson", "Walker", "Young",
-        "Allen", "King", "Wright", "Scott", "Torres", "Nguyen", "Hill", "Flores",
-        "Green", "Adams", "Nelson", "Baker", "Hall", "Rivera", "Campbell", "Mitchell",
-        "Carter", "Roberts", "Gomez", "Phillips", "Evans", "Turner", "Diaz", "Parker"
-    ]
-    
-    first_name = random.choice(first_names)
-    last_name = random.choice(last_names)
-    
-    return first_name, last_name
-
-def generate_random_email(first_name, last_name):
-    """Generate email ending with @example.com"""
-    # Create variations of email formats
-    formats = [
-        f"{first_name.lower()}.{last_name.lower()}",
-        f"{first_name.lower()}{last_name.lower()}",
-        f"{first_name[0].lower()}{last_name.lower()}",
-        f"{first_name.lower()}{last_name[0].lower()}",
-        f"{first_name.lower()}.{last_name.lower()}{random.randint(1, 99)}"
-    ]
-    
-    email_prefix = random.choice(formats)
-    return f"{email_prefix}@example.com"
-
-def generate_reservation_dates(start_date, end_date):
-    """Generate random check-in and check-out dates within the range with random 1-7 night stays"""
-    start_dt = datetime.strptime(start_date, '%Y-%m-%d')
-    end_dt = datetime.strptime(end_date, '%Y-%m-%d')
-
-    # Generate random stay length first (1-7 nights)
-    stay_length = random.randint(1, 7)
-
-    # Calculate the range of possible check-in dates
-    # Ensure there's room for the selected stay length
-    max_checkin_date = end_dt - timedelta(days=stay_length)
-
-    if start_dt > max_checkin_date:
-        # If the date range is too small for this stay length, adjust
-        checkin_date = start_dt
-        # Adjust stay length to fit within available dates
-        max_possible_stay = (end_dt - start_dt).days
-        if max_possible_stay > 0:
-            stay_length = min(stay_length, max_possible_stay)
-        else:
-            stay_length = 1
+            with timed(profiler, 'retry_backoff', cpu=False):
+                await asyncio.sleep(policy.delay(retry_count + 1, retry_after))
+
+        # Never resend a request the server may already have acted on without checking first
+        if ambiguous and duplicate_check is not None:
+            with timed(profiler, 'duplicate_check', cpu=False):
+                existing = await asyncio.get_running_loop().run_in_executor(None, duplicate_check)
+            checked = _checked_duplicate_result(existing, failure, endpoint, retry_count)
+            if checked is not None:
+                return checked
+
+        if retry_count >= max_retries:
+            return failure
+        retry_count += 1
+        metrics.inc('cloudbeds_api_retries_total', endpoint=endpoint)
+
+# Guest name pools (duplicates are intentional and weight those names)
+FIRST_NAMES = (
+    "James", "Mary", "John", "Patricia", "Robert", "Jennifer", "Michael", "Linda",
+    "William", "Elizabeth", "David", "Barbara", "Richard", "Susan", "Joseph", "Jessica",
+    "Thomas", "Sarah", "Christopher", "Karen", "Charles", "Nancy", "Daniel", "Lisa",
+    "Matthew", "Betty", "Anthony", "Helen", "Mark", "Sandra", "Donald", "Donna",
+    "Steven", "Carol", "Paul", "Ruth", "Andrew", "Sharon", "Kenneth", "Michelle",
+    "Joshua", "Laura", "Kevin", "Sarah", "Brian", "Kimberly", "George", "Deborah",
+    "Edward", "Dorothy", "Ronald", "Lisa", "Timothy", "Nancy", "Jason", "Karen"
+)
+
+LAST_NAMES = (
+    "Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis",
+    "Rodriguez", "Martinez", "Hernandez", "Lopez", "Gonzalez", "Wilson", "Anderson", "Thomas",
+    "Taylor", "Moore", "Jackson", "Martin", "Lee", "Perez", "Thompson", "White",
+    "Harris", "Sanchez", "Clark", "Ramirez", "Lewis", "Robinson", "Walker", "Young",
+    "Allen", "King", "Wright", "Scott", "Torres", "Nguyen", "Hill", "Flores",
+    "Green", "Adams", "Nelson", "Baker", "Hall", "Rivera", "Campbell", "Mitchell",
+    "Carter", "Roberts", "Gomez", "Phillips", "Evans", "Turner", "Diaz", "Parker"
+)
+
+# (name, lowercase name) pairs so email generation never re-lowercases
+_FIRST_NAME_PAIRS = tuple((name, name.lower()) for name in FIRST_NAMES)
+_LAST_NAME_PAIRS = tuple((name, name.lower()) for name in LAST_NAMES)
+
+# Email local-part variations, all ending in @example.com
+EMAIL_FORMATS = (
+    '{first}.{last}@example.com',
+    '{first}{last}@example.com',
+    '{first_initial}{last}@example.com',
+    '{first}{last_initial}@example.com',
+    '{first}.{last}{number}@example.com'
+)
+
+# Bounds of the default (uniform) stay-length profile, in nights
+MIN_STAY_NIGHTS = 1
+MAX_STAY_NIGHTS = 7
+
+WEEKDAYS = ('mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun')
+
+# Built-in stay profiles: ({nights: weight}, arrival weights Monday..Sunday or None)
+STAY_PROFILES = {
+    'uniform': ({n: 1 for n in range(MIN_STAY_NIGHTS, MAX_STAY_NIGHTS + 1)}, None),
+    # Short midweek trips arriving Sunday to Tuesday
+    'business': ({1: 30, 2: 30, 3: 20, 4: 12, 5: 8}, (3, 2.5, 1.5, 0.7, 0.3, 0.2, 2)),
+    # Weekend breaks and week-long holidays arriving Thursday to Saturday
+    'leisure': ({1: 8, 2: 30, 3: 25, 4: 12, 5: 8, 6: 5, 7: 12}, (0.6, 0.5, 0.7, 1.5, 3, 1.5, 0.7)),
+    'long_stay': ({7: 25, 10: 15, 14: 30, 21: 15, 28: 15}, None)
+}
+
+class StayProfile:
+    """Stay-length distribution and day-of-week arrival weights for one room type
+
+    Lengths are drawn conditioned on the weekday of the next arrival in the lane.
+    """
+
+    def __init__(self, stay_weights, arrival_weights=None):
+        weights = {}
+        for nights, weight in stay_weights.items():
+            nights, weight = int(nights), float(weight)
+            if nights < 1 or weight < 0:
+                raise ValueError(f"Invalid stay length weight {nights}: {weight}")
+            if weight > 0:
+                weights[nights] = weight
+        if not weights:
+            raise ValueError("Stay length weights must include at least one positive weight")
+
+        arrival = [float(w) for w in (arrival_weights or (1,) * 7)]
+        if len(arrival) != 7 or min(arrival) < 0 or not sum(arrival):
+            raise ValueError("Arrival weights need 7 non-negative values (Monday first), not all zero")
+
+        self.nights = sorted(weights)
+        self.max_nights = self.nights[-1]
+        self.stay_weights = [weights[n] for n in self.nights]
+        self.arrival_weights = arrival
+        self.base_cum_weights = list(itertools.accumulate(self.stay_weights))
+        # cum_weights[w]: lengths for a stay starting on weekday w, weighted by the next arrival's weekday
+        self.cum_weights = []
+        for weekday in range(7):
+            conditioned = [w * arrival[(weekday + n) % 7] for n, w in zip(self.nights, self.stay_weights)]
+            if not sum(conditioned):
+                conditioned = self.stay_weights
+            self.cum_weights.append(list(itertools.accumulate(conditioned)))
+
+        self.mean_nights = sum(n * w for n, w in zip(self.nights, self.stay_weights)) / sum(self.stay_weights)
+
+    @functools.cached_property
+    def expected_nights(self):
+        """Mean stay length in a full lane, from the weekday Markov chain's stationary distribution
+
+        Averaging the iterates also converges for periodic chains, e.g. all 7-night stays.
+        """
+        transitions = []
+        conditional_means = []
+        for cum in self.cum_weights:
+            probs = [b - a for a, b in zip([0.0] + cum, cum)]
+            total = cum[-1]
+            row = [0.0] * 7
+            for n, p in zip(self.nights, probs):
+                row[n % 7] += p / total
+            transitions.append(row)
+            conditional_means.append(sum(n * p for n, p in zip(self.nights, probs)) / total)
+
+        dist = [1 / 7] * 7
+        average = [0.0] * 7
+        iterations = 500
+        for _ in range(iterations):
+            # Chain is relative: from weekday w, n nights later is weekday (w + n) % 7
+            dist = [sum(dist[w] * transitions[w][(d - w) % 7] for w in range(7)) for d in range(7)]
+            average = [a + p / iterations for a, p in zip(average, dist)]
+        return sum(p * m for p, m in zip(average, conditional_means))
+
+    def draw(self, rng, weekday):
+        """Stay length for a lane stay starting on weekday (0 = Monday)"""
+        cum = self.cum_weights[weekday]
+        return self.nights[bisect.bisect_right(cum, rng.random() * cum[-1])]
+
+    def draw_unconditioned(self, rng):
+        cum = self.base_cum_weights
+        return self.nights[bisect.bisect_right(cum, rng.random() * cum[-1])]
+
+    def expected_reservations(self, num_days, units, percentage):
+        """Analytic expected stay count for plan_room_type_stays with these arguments"""
+        target = max(0.0, min(float(units), units * percentage / 100))
+        full_lanes = int(target)
+        # A full lane holds one stay per expected_nights, plus the stay already in progress on night 0
+        expected = full_lanes * (num_days / self.expected_nights + 1) if num_days else 0
+        return expected + (target - full_lanes) * num_days / self.mean_nights
+
+def stay_profile_for(config, data=None):
+    """StayProfile for one room type config, falling back to request-wide settings
+
+    stayProfile names a built-in profile; stayLengthWeights ({nights:
+    weight}) and arrivalWeights (7 values from Monday, or {weekday: weight})
+    override its parts.
+    """
+    data = data or {}
+
+    def setting(key):
+        return config.get(key, data.get(key))
+
+    name = setting('stayProfile') or 'uniform'
+    if name not in STAY_PROFILES:
+        raise ValueError(f"Unknown stayProfile {name!r} (choose from {', '.join(STAY_PROFILES)})")
+    stay_weights, arrival_weights = STAY_PROFILES[name]
+
+    arrival_setting = setting('arrivalWeights')
+    if isinstance(arrival_setting, dict):
+        unknown = set(map(str.lower, arrival_setting)) - set(WEEKDAYS)
+        if unknown:
+            raise ValueError(f"Unknown arrivalWeights days: {', '.join(sorted(unknown))}")
+        by_day = {day.lower(): weight for day, weight in arrival_setting.items()}
+        arrival_weights = [by_day.get(day, 1) for day in WEEKDAYS]
+    elif arrival_setting:
+        arrival_weights = arrival_setting
+
+    return StayProfile(setting('stayLengthWeights') or stay_weights, arrival_weights)
+
+def stay_profiles(data):
+    """StayProfile for each of a fill request's roomTypeConfigs, or None where its percentage is 0"""
+    return [stay_profile_for(config, data) if config.get('percentage', 0) > 0 else None
+            for config in data.get('roomTypeConfigs', [])]
+
+DEFAULT_STAY_PROFILE = StayProfile(*STAY_PROFILES['uniform'])
+
+def plan_room_type_stays(num_days, units, percentage, rng=random, profile=None, start_weekday=0, free=None):
+    """Plan every stay for one room type so each night is within one room of the target occupancy
+
+    free, if given, is the rooms still bookable per night, capping the target per night.
+    Returns (stays, occupancy): (checkin_offset, nights) tuples and rooms planned per night.
+    """
+    profile = profile or DEFAULT_STAY_PROFILE
+    target = max(0.0, min(float(units), units * percentage / 100))
+    full_lanes = int(target)
+    fraction = target - full_lanes
+
+    stays = []
+    for lane in range(full_lanes):
+        for start, end in _lane_runs(num_days, free, lane):
+            _fill_lane(stays, start, end, 1.0, rng, profile, start_weekday)
+    if fraction > 0:
+        for start, end in _lane_runs(num_days, free, full_lanes):
+            _fill_lane(stays, start, end, fraction, rng, profile, start_weekday)
+
+    rng.shuffle(stays)
+    return stays, nightly_occupancy(stays, num_days)
+
+def _lane_runs(num_days, free, lane):
+    """(start, end) night ranges where lane can take a room: everywhere, or where more than lane rooms are free"""
+    if free is None:
+        return [(0, num_days)] if num_days > 0 else []
+    runs = []
+    start = None
+    for night in range(num_days):
+        if free[night] > lane:
+            if start is None:
+                start = night
+        elif start is not None:
+            runs.append((start, night))
+            start = None
+    if start is not None:
+        runs.append((start, num_days))
+    return runs
+
+def _fill_lane(stays, start, end, fill_ratio, rng, profile, start_weekday):
+    """Tile nights start..end-1 of one lane with stays covering roughly fill_ratio of them
+
+    Full lanes follow the profile's arrival weights; the partial lane's
+    random gaps would scramble them, so it draws plain stay lengths.
+    """
+    append = stays.append
+    if fill_ratio < 1:
+        mean_gap = profile.mean_nights * (1 - fill_ratio) / fill_ratio
+        night = start + int(rng.uniform(0, 2 * mean_gap))
+        while night < end:
+            length = min(profile.draw_unconditioned(rng), end - night)
+            append((night, length))
+            night += length + int(round(rng.expovariate(1 / mean_gap)))
+        return
+
+    if start == 0:
+        # Start part-way through a stay so lanes don't all check in on night 0
+        length = profile.draw_unconditioned(rng)
+        length -= int(rng.random() * length)
+    else:
+        # The room frees up here, so the first guest checks in
+        length = profile.draw(rng, (start_weekday + start) % 7)
+    night = start
+    draw = profile.draw
+    while night < end:
+        length = min(length, end - night)
+        append((night, length))
+        night += length
+        length = draw(rng, (start_weekday + night) % 7)
+
+def nightly_occupancy(stays, num_days):
+    """Per-night room count for a list of (checkin_offset, nights) stays"""
+    diff = [0] * (num_days + 1)
+    for checkin, nights in stays:
+        diff[checkin] += 1
+        diff[checkin + nights] -= 1
+    occupancy = []
+    running = 0
+    for delta in diff[:num_days]:
+        running += delta
+        occupancy.append(running)
+    return occupancy
+
+# Every generated thirdPartyIdentifier starts with this, so cleanup can find them
+DEMO_ID_PREFIX = 'demo-'
+
+class GenerationContext:
+    """Seeded RNG and thirdPartyIdentifier sequence for one fill
+
+    The run tag hashes the seed with run_id (the job ID), so jobs reusing a seed get distinct identifiers.
+    """
+
+    def __init__(self, seed=None, run_id=None):
+        self.seed = seed if seed is not None else secrets.randbits(32)
+        self.run_id = run_id
+        self.rng = random.Random(self.seed)
+        tag_source = f"{self.seed}:{run_id}" if run_id is not None else str(self.seed)
+        self.run_tag = hashlib.sha256(tag_source.encode()).hexdigest()[:8]
+        self.sequence = 0
+
+    def next_third_party_id(self):
+        self.sequence += 1
+        return f"{DEMO_ID_PREFIX}{self.run_tag}-{self.sequence:06d}"
+
+    def fork(self):
+        """Independent copy at the current position, to replay the same draws later"""
+        clone = GenerationContext(self.seed, self.run_id)
+        clone.rng.setstate(self.rng.getstate())
+        clone.sequence = self.sequence
+        return clone
+
+def fill_window(data):
+    """(start_dt, num_days) of a fill request"""
+    start_dt = datetime.strptime(data.get('startDate'), '%Y-%m-%d')
+    end_dt = datetime.strptime(data.get('endDate'), '%Y-%m-%d')
+    return start_dt, (end_dt - start_dt).days
+
+def build_fill_plan(data, context, free_by_type=None, profiles=None):
+    """Plan stays for every room type in a fill request
+
+    free_by_type optionally maps room type IDs (as strings) to the rooms
+    still bookable per night, from the availability pre-flight. profiles
+    is stay_profiles(data), if the caller already built it.
+
+    Returns (start_dt, num_days, plans) where plans is a list of
+    (config, stays, occupancy) for each room type with a percentage above 0.
+    """
+    start_dt, num_days = fill_window(data)
+
+    # Plan every stay for every room type up front so per-night occupancy is
+    # exact and the total reservation count is known before dispatch starts
+    if profiles is None:
+        profiles = stay_profiles(data)
+    plans = []
+    for config, profile in zip(data.get('roomTypeConfigs', []), profiles):
+        if profile is None:
+            continue
+        free = free_by_type.get(str(config.get('roomTypeID'))) if free_by_type is not None else None
+        stays, occupancy = plan_room_type_stays(num_days, config.get('roomTypeUnits', 0), config.get('percentage', 0),
+                                                context.rng, profile, start_dt.weekday(), free)
+        plans.append((config, stays, occupancy))
+
+    return start_dt, num_days, plans
+
+class ReservationPayloadFactory:
+    """postReservation form bodies for one fill, with the constant parts precomputed"""
+
+    def __init__(self, property_id, source_id, start_dt, num_days, allotment_block_code=None):
+        self.property_id = property_id
+        self.source_id = source_id
+        self.allotment_block_code = allotment_block_code
+        # Every check-in and check-out date a plan over num_days can reference; stays are
+        # clipped to the window, so the last checkout is night num_days
+        self.dates = [(start_dt + timedelta(days=d)).strftime('%Y-%m-%d') for d in range(num_days + 1)]
+        self.room_fields = {}
+
+    def _room_fields(self, rooms):
+        """rooms/adults/children as the JSON strings the API expects
+
+        rooms is a tuple of (room_type_id, quantity); each room gets one adult.
+        """
+        fields = self.room_fields.get(rooms)
+        if fields is None:
+            fields = self.room_fields[rooms] = (
+                json.dumps([{"roomTypeID": room_type_id, "quantity": quantity} for room_type_id, quantity in rooms]),
+                json.dumps([{"quantity": quantity, "roomTypeID": room_type_id} for room_type_id, quantity in rooms]),
+                json.dumps([{"roomTypeID": room_type_id, "quantity": 0} for room_type_id, _ in rooms])
+            )
+        return fields
+
+    def iter_payloads(self, context, room_type_id, stays):
+        """Yield the single-room form body for each (checkin_offset, stay_length) in stays"""
+        rooms = ((room_type_id, 1),)
+        return self.iter_group_payloads(context, ((checkin, nights, rooms) for checkin, nights in stays))
+
+    def iter_group_payloads(self, context, groups):
+        """Yield the form body for each (checkin_offset, stay_length, rooms) in groups
+
+        rooms is a tuple of (room_type_id, quantity). Guests are drawn from
+        the context's seeded RNG in a fixed order, so a forked context
+        replays exactly the same payloads.
+        """
+        rng = context.rng
+        choice = rng.choice
+        randint = rng.randint
+        dates = self.dates
+        room_fields = self._room_fields
+        property_id = self.property_id
+        source_id = self.source_id
+        allotment_block_code = self.allotment_block_code
+
+        for checkin_offset, stay_length, rooms_key in groups:
+            rooms, adults, children = room_fields(rooms_key)
+            first_name, first = choice(_FIRST_NAME_PAIRS)
+            last_name, last = choice(_LAST_NAME_PAIRS)
+            number = randint(1, 99)
+            email = choice(EMAIL_FORMATS).format(first=first, last=last, first_initial=first[0],
+                                                 last_initial=last[0], number=number)
+            # Field order matches the Cloudbeds API schema
+            payload = {
+                'propertyID': property_id,
+                'startDate': dates[checkin_offset],
+                'endDate': dates[checkin_offset + stay_length],
+                'guestFirstName': first_name,
+                'guestLastName': last_name,
+                'guestEmail': email,
+                'guestCountry': 'US',
+                'guestZip': '12345',
+                'guestPhone': str(randint(2000000000, 9999999999)),
+                'guestGender': 'M',  # Default gender
+                'paymentMethod': 'ebanking',
+                'sourceID': source_id,
+                'thirdPartyIdentifier': context.next_third_party_id(),
+                'sendEmailConfirmation': False,
+                'rooms': rooms,
+                'adults': adults,
+                'children': children
+            }
+            if allotment_block_code:
+                payload['allotmentBlockCode'] = allotment_block_code
+            yield payload
+
+def grouping_settings(data):
+    """(max_rooms_per_reservation, group_across_room_types) from a fill request"""
+    return max(1, int(data.get('maxRoomsPerReservation') or 1)), bool(data.get('groupAcrossRoomTypes'))
+
+def group_planned_stays(plans, max_rooms, across_room_types=False):
+    """Combine planned stays with identical dates into multi-room reservations
+
+    Returns a list of (checkin_offset, stay_length, rooms) where rooms is a
+    tuple of (plan_index, quantity) adding up to at most max_rooms. Stays
+    are only combined within a room type unless across_room_types is set.
+    Groups come out in the order their dates first appear in the (shuffled)
+    plans, so the occupancy plan itself is unchanged.
+    """
+    buckets = {}  # (checkin, nights) or (plan_index, checkin, nights) -> {plan_index: rooms}
+    for plan_index, (_, stays, _) in enumerate(plans):
+        for checkin, nights in stays:
+            key = (checkin, nights) if across_room_types else (plan_index, checkin, nights)
+            counts = buckets.get(key)
+            if counts is None:
+                counts = buckets[key] = {}
+            counts[plan_index] = counts.get(plan_index, 0) + 1
+
+    groups = []
+    for key, counts in buckets.items():
+        checkin, nights = key[-2:]
+        rooms = []
+        size = 0
+        for plan_index, count in counts.items():
+            while count:
+                quantity = min(count, max_rooms - size)
+                rooms.append((plan_index, quantity))
+                size += quantity
+                count -= quantity
+                if size == max_rooms:
+                    groups.append((checkin, nights, tuple(rooms)))
+                    rooms = []
+                    size = 0
+        if rooms:
+            groups.append((checkin, nights, tuple(rooms)))
+    return groups
+
+def iter_planned_group_payloads(factory, context, plans, groups):
+    """Form bodies for group_planned_stays() output, with plan indexes mapped to room type IDs"""
+    room_type_ids = [config.get('roomTypeID') for config, _, _ in plans]
+    return factory.iter_group_payloads(
+        context, ((checkin, nights, tuple((room_type_ids[p], q) for p, q in rooms))
+                  for checkin, nights, rooms in groups))
+
+def rooms_label(rooms):
+    """Log label for a task's [(room_results, quantity)]: "Suite" or "Suite x2 + Standard" """
+    return ' + '.join(room_results['roomTypeName'] if quantity == 1 else f"{room_results['roomTypeName']} x{quantity}"
+                      for room_results, quantity in rooms)
+
+class PlannedTasks:
+    """Lazy, re-iterable dispatch tasks for a freshly planned fill
+
+    Each pass regenerates the payloads from a fork of the seeded context.
+    """
+
+    def __init__(self, context, factory, plans, results, groups=None):
+        self.context = context.fork()
+        self.factory = factory
+        self.plans = plans
+        self.results = results
+        self.groups = groups
+
+    def __len__(self):
+        if self.groups is not None:
+            return len(self.groups)
+        return sum(len(stays) for _, stays, _ in self.plans)
+
+    def __iter__(self):
+        if self.groups is not None:
+            yield from self._iter_groups()
+            return
+        context = self.context.fork()
+        seq = 0
+        for (config, stays, _), room_results in zip(self.plans, self.results):
+            payloads = self.factory.iter_payloads(context, config.get('roomTypeID'), stays)
+            rooms = [(room_results, 1)]
+            for i, ((_, stay_length), reservation_data) in enumerate(zip(stays, payloads)):
+                yield {
+                    'seq': seq,
+                    'rooms': rooms,
+                    'index': i + 1,
+                    'num_reservations': room_results['requested'],
+                    'reservation_data': reservation_data,
+                    'stay_length': stay_length
+                }
+                seq += 1
+
+    def _iter_groups(self):
+        context = self.context.fork()
+        # Reservations are numbered per room type of their first room
+        totals = Counter(rooms[0][0] for _, _, rooms in self.groups)
+        indexes = Counter()
+        payloads = iter_planned_group_payloads(self.factory, context, self.plans, self.groups)
+        for seq, ((_, stay_length, rooms), reservation_data) in enumerate(zip(self.groups, payloads)):
+            first = rooms[0][0]
+            indexes[first] += 1
+            yield {
+                'seq': seq,
+                'rooms': [(self.results[p], q) for p, q in rooms],
+                'index': indexes[first],
+                'num_reservations': totals[first],
+                'reservation_data': reservation_data,
+                'stay_length': stay_length
+            }
+
+def _collect_payloads(payloads, reservations):
+    """Append payloads to reservations, or just run the generator when it is None"""
+    if reservations is not None:
+        reservations.extend(payloads)
     else:
-        # Random check-in date within the valid range
-        days_diff = (max_checkin_date - start_dt).days
-        random_days = random.randint(0, max(0, days_diff))
-        checkin_date = start_dt + timedelta(days=random_days)
+        for _ in payloads:
+            pass
+
+def run_dry_run(data, property_id, include_reservations=False, max_reservations=None, profiles=None):
+    """Build the full fill plan without calling postReservation
+
+    Returns per-room-type, per-night occupancy counts and the stay-length
+    distribution; with include_reservations the generated form bodies too,
+    or ValueError if there would be more than max_reservations of them.
+    """
+    started = time.monotonic()
+    context = GenerationContext(data.get('seed'))
+    if profiles is None:
+        profiles = stay_profiles(data)
+    start_dt, num_days, plans = build_fill_plan(data, context, profiles=profiles)
+    factory = ReservationPayloadFactory(property_id, None, start_dt, num_days, data.get('allotmentBlockCode'))
+    dates = factory.dates[:num_days]
+
+    room_types = []
+    total_by_night = [0] * num_days
+    reservations = [] if include_reservations else None
+    max_rooms, across_room_types = grouping_settings(data)
+    groups = group_planned_stays(plans, max_rooms, across_room_types) if max_rooms > 1 else None
+    if include_reservations and max_reservations is not None:
+        planned = len(groups) if groups is not None else sum(len(stays) for _, stays, _ in plans)
+        if planned > max_reservations:
+            raise ValueError(f"Plan has {planned} reservations; includeReservations returns at most {max_reservations}")
+
+    # build_fill_plan skips the same configs, so the remaining profiles line up with plans
+    planned_profiles = [profile for profile in profiles if profile is not None]
+    for (config, stays, occupancy), profile in zip(plans, planned_profiles):
+        room_type_id = config.get('roomTypeID')
+        units = config.get('roomTypeUnits', 0)
+
+        stay_length_counts = [0] * (profile.max_nights + 1)
+        for _, stay_length in stays:
+            stay_length_counts[stay_length] += 1
+        # Generate guests exactly as a real run would, so the seed stays in step
+        if groups is None:
+            _collect_payloads(factory.iter_payloads(context, room_type_id, stays), reservations)
+
+        for night, rooms in enumerate(occupancy):
+            total_by_night[night] += rooms
+
+        room_types.append({
+            'roomTypeID': room_type_id,
+            'roomTypeName': config.get('roomTypeName'),
+            'roomTypeUnits': units,
+            'percentage': config.get('percentage', 0),
+            'targetRoomsPerNight': units * config.get('percentage', 0) / 100,
+            'reservations': len(stays),
+            'expectedReservations': round(profile.expected_reservations(num_days, units, config.get('percentage', 0)), 1),
+            'expectedStayNights': round(profile.expected_nights, 3),
+            'roomNights': sum(occupancy),
+            'occupancy': occupancy,
+            'stayLengthDistribution': {
+                str(nights): count for nights, count in enumerate(stay_length_counts) if count
+            }
+        })
+
+    if groups is not None:
+        _collect_payloads(iter_planned_group_payloads(factory, context, plans, groups), reservations)
+
+    total_room_stays = sum(rt['reservations'] for rt in room_types)
+    result = {
+        'dates': dates,
+        'roomTypes': room_types,
+        'totalOccupancy': total_by_night,
+        'summary': {
+            'total_reservations': len(groups) if groups is not None else total_room_stays,
+            'total_room_stays': total_room_stays,
+            'total_room_nights': sum(total_by_night),
+            'seed': context.seed,
+            'planning_seconds': round(time.monotonic() - started, 3)
+        }
+    }
+    if reservations is not None:
+        result['reservations'] = reservations
+    return result
+
+# Per room type, the most common failure messages returned with the job
+# result; at most ERROR_SUMMARY_MAX_DISTINCT messages are counted
+# separately, the rest are lumped together. Every individual outcome is
+# in the journal (GET /api/jobs/<id>/reservations).
+ERROR_SUMMARY_TOP_N = 10
+ERROR_SUMMARY_MAX_DISTINCT = 100
+OTHER_ERRORS = '(other errors)'
+
+def new_room_results(room_type_id, room_type_name, requested=0):
+    """Incremental, fixed-size outcome counters for one room type"""
+    return {
+        'roomTypeID': room_type_id,
+        'roomTypeName': room_type_name,
+        'requested': requested,
+        'created': 0,
+        'failed': 0,
+        'retries': 0,
+        # Room-nights of the target that existing bookings left no room for (pre-flight only)
+        'unavailable_room_nights': 0,
+        'errors': Counter(),
+        # stay_length_histogram[n] = reservations created with an n-night stay
+        'stay_length_histogram': [0] * (MAX_STAY_NIGHTS + 1)
+    }
 
-    checkout_date = checkin_date + timedelta(days=stay_length)
+def record_created_stay(room_results, stay_length, quantity=1):
+    room_results['created'] += quantity
+    histogram = room_results['stay_length_histogram']
+    if stay_length >= len(histogram):
+        histogram.extend([0] * (stay_length + 1 - len(histogram)))
+    histogram[stay_length] += quantity
+
+def record_failure(room_results, message, quantity=1):
+    room_results['failed'] += quantity
+    errors = room_results['errors']
+    if message not in errors and len(errors) >= ERROR_SUMMARY_MAX_DISTINCT:
+        message = OTHER_ERRORS
+    errors[message] += quantity
+
+def summarize_room_results(room_results):
+    """JSON-ready copy of room_results with errors reduced to the top messages and their counts"""
+    summary = dict(room_results)
+    summary['errors'] = [{'message': message, 'count': count}
+                         for message, count in room_results['errors'].most_common(ERROR_SUMMARY_TOP_N)]
+    return summary
+
+def plan_reservation_tasks(job, credentials, data, requests_per_second, rate_limiter=None):
+    """Look up the source, plan every stay and build one dispatch task per reservation"""
+    log.info("Starting reservation creation process (job %s)", job.id)
+
+    # Get available source ID
+    with timed(job.profiler, 'source_lookup'):
+        source_id = get_available_sources(credentials)
+    log.info("Will use sourceID for all reservations: %s", source_id)
+
+    if not source_id:
+        raise RuntimeError("CRITICAL: No source ID available! Cannot create reservations.")
+
+    room_type_configs = data.get('roomTypeConfigs', [])
+    start_date = data.get('startDate')
+    end_date = data.get('endDate')
+    allotment_block_code = data.get('allotmentBlockCode')
+
+    log.info("Room types to process: %d", len(room_type_configs))
+
+    # Pin the seed in the request so the journal records how to regenerate this plan
+    context = GenerationContext(data.get('seed'), job.id)
+    data['seed'] = context.seed
+    log.info("Generation seed: %s", context.seed)
+
+    results = []
+    capacity = None
+    if data.get('preflight'):
+        start_dt, num_days = fill_window(data)
+        room_type_ids = [str(config.get('roomTypeID')) for config in room_type_configs if config.get('percentage', 0) > 0]
+        with timed(job.profiler, 'preflight'):
+            capacity = CapacityIndex.build(credentials, start_dt, num_days, room_type_ids, rate_limiter)
+        log.info("Pre-flight: %d getAvailableRoomTypes calls", capacity.calls)
+
+    with timed(job.profiler, 'planning'):
+        start_dt, num_days, plans = build_fill_plan(data, context, capacity.free if capacity else None)
+
+    log.info("Date range: %d days (%s to %s)", num_days, start_date, end_date)
+
+    total_room_stays = sum(len(stays) for _, stays, _ in plans)
+    max_rooms, across_room_types = grouping_settings(data)
+    with timed(job.profiler, 'planning'):
+        groups = group_planned_stays(plans, max_rooms, across_room_types) if max_rooms > 1 else None
+    total_expected = len(groups) if groups is not None else total_room_stays
+
+    estimated_seconds = total_expected / requests_per_second
+    log.info("Total reservations to create: %d (estimated ~%d minutes at %s req/s)",
+             total_expected, int(estimated_seconds / 60), requests_per_second)
+    if groups is not None:
+        log.info("Grouped %d room-stays into %d reservations (up to %d rooms each%s)",
+                 total_room_stays, len(groups), max_rooms, ', across room types' if across_room_types else '')
+
+    # Tasks are generated lazily from the seeded context, for the journal
+    # and then again for the dispatch loop
+    factory = ReservationPayloadFactory(credentials['property_id'], source_id, start_dt, num_days, allotment_block_code)
+
+    for config, stays, occupancy in plans:
+        room_type_id = config.get('roomTypeID')
+        room_type_name = config.get('roomTypeName')
+        room_type_units = config.get('roomTypeUnits', 0)
+        percentage = config.get('percentage', 0)
+        num_reservations = len(stays)
+
+        total_room_nights_available = num_days * room_type_units
+        planned_room_nights = sum(occupancy)
+
+        log.info(
+            "Plan for %s: %d units over %d days (%d room-nights available), target %s%% = %.1f rooms/night, "
+            "planned %s rooms/night, %d room-nights, %d reservations",
+            room_type_name, room_type_units, num_days, total_room_nights_available, percentage,
+            room_type_units * (percentage / 100),
+            f"{min(occupancy)}-{max(occupancy)}" if occupancy else '0', planned_room_nights, num_reservations
+        )
+
+        room_results = new_room_results(room_type_id, room_type_name, num_reservations)
+        if capacity:
+            target = room_type_units * percentage / 100
+            room_results['unavailable_room_nights'] = round(
+                sum(max(0.0, target - free) for free in capacity.free[str(room_type_id)]))
+        results.append(room_results)
+
+    # Guest data comes from the job's seeded context, never the global RNG
+    return results, PlannedTasks(context, factory, plans, results, groups)
+
+def available_room_counts(credentials, start_date, end_date, rate_limiter=None):
+    """{roomTypeID: rooms free per night from start_date up to end_date}
+
+    Asks getAvailableRoomTypes for detailed rates, which list roomsAvailable
+    for each night. Without them every night gets the stay-wide minimum.
+    Room types it leaves out are sold out on at least one of the nights.
+    """
+    params = {'propertyIDs': credentials['property_id'], 'startDate': start_date, 'endDate': end_date,
+              'rooms': 1, 'adults': 1, 'children': 0, 'detailedRates': 'true'}
+    result = make_api_call(GET_AVAILABLE_ROOM_TYPES_URL, params, credentials, rate_limiter=rate_limiter)
+    if not result['success']:
+        raise RuntimeError(f"getAvailableRoomTypes failed: {result['error']}")
 
-    # Make sure checkout doesn't exceed the end date
-    if checkout_date > end_dt:
-        checkout_date = end_dt
-        stay_length = (checkout_date - checkin_date).days
+    start_dt = datetime.strptime(start_date, '%Y-%m-%d')
+    dates = [(start_dt + timedelta(days=d)).strftime('%Y-%m-%d')
+             for d in range((datetime.strptime(end_date, '%Y-%m-%d') - start_dt).days)]
+    properties = result['data'].get('data', []) if isinstance(result['data'], dict) else result['data']
+    counts = {}
+    for prop in properties or []:
+        for room in prop.get('propertyRooms', []):
+            by_date = {night.get('date'): int(night.get('roomsAvailable') or 0)
+                       for night in room.get('roomRateDetailed') or []}
+            overall = int(room.get('roomsAvailable') or 0)
+            counts[str(room.get('roomTypeID'))] = [by_date.get(night, overall) for night in dates]
+    return counts
+
+class CapacityIndex:
+    """Free rooms per room type and night, from getAvailableRoomTypes in fixed PREFLIGHT_CHUNK_NIGHTS windows
+
+    A room type the API leaves out of a window is treated as full for all of it.
+    """
+
+    def __init__(self, free, calls=0):
+        self.free = free  # room type ID -> free rooms per night offset
+        self.calls = calls
+
+    @classmethod
+    def build(cls, credentials, start_dt, num_days, room_type_ids, rate_limiter=None, chunk_nights=None):
+        chunk_nights = chunk_nights or PREFLIGHT_CHUNK_NIGHTS
+        index = cls({room_type_id: [0] * num_days for room_type_id in room_type_ids})
+        for lo in range(0, num_days, chunk_nights):
+            hi = min(num_days, lo + chunk_nights)
+            counts = available_room_counts(credentials, (start_dt + timedelta(days=lo)).strftime('%Y-%m-%d'),
+                                           (start_dt + timedelta(days=hi)).strftime('%Y-%m-%d'), rate_limiter)
+            index.calls += 1
+            for room_type_id, free in index.free.items():
+                if room_type_id in counts:
+                    free[lo:hi] = counts[room_type_id]
+        return index
+
+def load_journaled_tasks(job_id):
+    """Rebuild results and the remaining dispatch tasks for a job from its journal"""
+    job_record = fill_journal.get_job(job_id)
+    if not job_record:
+        raise RuntimeError(f"No journal found for job {job_id}")
+    data = json.loads(job_record['request_json'])
+
+    results = []
+    results_by_room_type = {}
+    for config in data.get('roomTypeConfigs', []):
+        if config.get('percentage', 0) <= 0:
+            continue
+        room_results = new_room_results(config.get('roomTypeID'), config.get('roomTypeName'))
+        results.append(room_results)
+        results_by_room_type[str(config.get('roomTypeID'))] = room_results
+
+    rows = fill_journal.load_reservations(job_id)
+    # Reservations are numbered per room type of their first room, as when planned
+    totals = Counter()
+    for row in rows:
+        payload = json.loads(row['payload_json'])
+        row['reservation_data'] = payload
+        row['rooms'] = [(results_by_room_type[str(room['roomTypeID'])], int(room.get('quantity', 1)))
+                        for room in json.loads(payload['rooms'])]
+        totals[row['rooms'][0][0]['roomTypeID']] += 1
+        for room_results, quantity in row['rooms']:
+            room_results['requested'] += quantity
+            if row['status'] == 'created':
+                record_created_stay(room_results, row['stay_length'], quantity)
+
+    tasks = []
+    indexes = Counter()
+    for row in rows:
+        first = row['rooms'][0][0]['roomTypeID']
+        indexes[first] += 1
+        # Reservations removed by a cleanup job were created once; don't recreate them
+        if row['status'] in ('created', 'cancelled'):
+            continue
+        tasks.append({
+            'seq': row['seq'],
+            'rooms': row['rooms'],
+            'index': indexes[first],
+            'num_reservations': totals[first],
+            'reservation_data': row['reservation_data'],
+            'stay_length': row['stay_length']
+        })
 
-    # Return dates plus the actual stay length for logging
-    return checkin_date.strftime('%Y-%m-%d'), checkout_date.strftime('%Y-%m-%d'), stay_length
+    already_created = sum(r['created'] for r in results)
+    log.info("Journal: %d planned, %d already created, %d to send", len(rows), already_created, len(tasks))
+    return results, tasks
+
+def reconcile_resumed_tasks(job, credentials, tasks, rate_limiter=None):
+    """Drop resumed tasks whose reservation was created before the job stopped
+
+    A reservation in flight when the job was interrupted may exist even
+    though its outcome was never journaled. One scan of the plan's check-in
+    window finds them; they are journaled as created instead of re-sent.
+    """
+    if not tasks:
+        return tasks
+    check_in_dates = [task['reservation_data']['startDate'] for task in tasks]
+    existing = find_existing_reservations(
+        credentials, (task['reservation_data']['thirdPartyIdentifier'] for task in tasks),
+        min(check_in_dates), max(check_in_dates), rate_limiter)
+
+    remaining = []
+    for task in tasks:
+        reservation = existing.get(task['reservation_data']['thirdPartyIdentifier'])
+        if reservation is None:
+            remaining.append(task)
+            continue
+        for room_results, quantity in task['rooms']:
+            record_created_stay(room_results, task['stay_length'], quantity)
+        fill_journal.record_outcome(job.id, task['seq'], 'created', reservation_id=str(reservation.get('reservationID')))
+
+    if existing:
+        log.info("Found %d reservations already created before the interruption", len(existing))
+    return remaining
+
+def post_reservation_task(task, credentials, limiter, cancel_event=None, circuit_breaker=None,
+                          duplicate_guard=None, profiler=None):
+    """Worker body: post one reservation under the shared rate limiter and circuit breaker"""
+    if cancel_event is not None and cancel_event.is_set():
+        return {'success': False, 'error': 'Cancelled', 'retries': 0, 'cancelled': True}
+
+    duplicate_check = None
+    if duplicate_guard is not None:
+        reservation_data = task['reservation_data']
+        duplicate_check = lambda: duplicate_guard.find(reservation_data['thirdPartyIdentifier'],
+                                                       reservation_data['startDate'])
+    return make_api_call(
+        POST_RESERVATION_URL,
+        {},  # No query params for POST
+        credentials,
+        method='POST',
+        data=task['reservation_data'],
+        use_form_data=True,  # Use form-encoded data for postReservation
+        circuit_breaker=circuit_breaker,
+        rate_limiter=limiter,
+        duplicate_check=duplicate_check,
+        profiler=profiler
+    )
+
+async def post_reservation_task_async(task, credentials, limiter, cancel_event=None, circuit_breaker=None,
+                                      duplicate_guard=None, profiler=None):
+    """post_reservation_task as a coroutine, for dispatch on the API event loop"""
+    if cancel_event is not None and cancel_event.is_set():
+        return {'success': False, 'error': 'Cancelled', 'retries': 0, 'cancelled': True}
+
+    duplicate_check = None
+    if duplicate_guard is not None:
+        reservation_data = task['reservation_data']
+        duplicate_check = lambda: duplicate_guard.find(reservation_data['thirdPartyIdentifier'],
+                                                       reservation_data['startDate'])
+    return await make_api_call_async(
+        POST_RESERVATION_URL,
+        {},
+        credentials,
+        method='POST',
+        data=task['reservation_data'],
+        use_form_data=True,
+        circuit_breaker=circuit_breaker,
+        rate_limiter=limiter,
+        duplicate_check=duplicate_check,
+        profiler=profiler
+    )
+
+def iter_reservations(credentials, params=None, rate_limiter=None):
+    """Yield every reservation getReservations returns for the property, page by page"""
+    page = 1
+    while True:
+        page_params = dict(params or {}, propertyID=credentials['property_id'],
+                           pageNumber=page, pageSize=RESERVATIONS_PAGE_SIZE)
+        result = make_api_call(GET_RESERVATIONS_URL, page_params, credentials, rate_limiter=rate_limiter)
+        if not result['success']:
+            raise RuntimeError(f"getReservations failed: {result['error']}")
+
+        reservations = result['data']
+        if isinstance(reservations, dict):
+            reservations = reservations.get('data', [])
+        yield from reservations
+        if len(reservations) < RESERVATIONS_PAGE_SIZE:
+            return
+        page += 1
+
+def find_reservations_by_prefix(credentials, prefix, rate_limiter=None, check_in_from=None, check_in_to=None):
+    """Active reservations whose thirdPartyIdentifier starts with prefix, as cleanup targets"""
+    params = {}
+    if check_in_from:
+        params['checkInFrom'] = check_in_from
+    if check_in_to:
+        params['checkInTo'] = check_in_to
+
+    targets = []
+    for reservation in iter_reservations(credentials, params, rate_limiter):
+        third_party_id = reservation.get('thirdPartyIdentifier') or ''
+        if third_party_id.startswith(prefix) and reservation.get('status') != 'canceled':
+            targets.append({'reservationID': str(reservation['reservationID']), 'thirdPartyIdentifier': third_party_id})
+    return targets
+
+def find_existing_reservations(credentials, third_party_ids, check_in_from, check_in_to, rate_limiter=None):
+    """Map each of third_party_ids that already exists server-side to its reservation
+
+    One paged getReservations scan over the check-in window answers the
+    whole batch, instead of one lookup per reservation.
+    """
+    wanted = set(third_party_ids)
+    existing = {}
+    params = {'checkInFrom': check_in_from, 'checkInTo': check_in_to}
+    for reservation in iter_reservations(credentials, params, rate_limiter):
+        third_party_id = reservation.get('thirdPartyIdentifier')
+        if third_party_id in wanted and reservation.get('status') != 'canceled':
+            existing[third_party_id] = reservation
+    return existing
+
+class DuplicateGuard:
+    """Batched existence checks for POSTs that may have reached the server
+
+    Checks for the same check-in date within `window` seconds share one getReservations scan.
+    """
+
+    def __init__(self, credentials, rate_limiter=None, window=0.25):
+        self.credentials = credentials
+        self.rate_limiter = rate_limiter
+        self.window = window
+        self.lock = threading.Lock()
+        self.pending = {}  # check-in date -> batch dict
+
+    def find(self, third_party_id, start_date):
+        """The existing reservation for third_party_id, None if absent, or DUPLICATE_CHECK_FAILED"""
+        with self.lock:
+            batch = self.pending.get(start_date)
+            leader = batch is None
+            if leader:
+                batch = self.pending[start_date] = {'ids': set(), 'done': threading.Event(), 'found': None}
+            batch['ids'].add(third_party_id)
+
+        if leader:
+            time.sleep(self.window)
+            with self.lock:
+                del self.pending[start_date]
+            try:
+                batch['found'] = find_existing_reservations(self.credentials, batch['ids'], start_date, start_date,
+                                                            self.rate_limiter)
+            except Exception as e:
+                log.warning("Duplicate check for %s failed: %s", start_date, e)
+            finally:
+                batch['done'].set()
+        else:
+            batch['done'].wait()
+
+        if batch['found'] is None:
+            metrics.inc('cloudbeds_duplicate_checks_total', outcome='error')
+            return DUPLICATE_CHECK_FAILED
+        existing = batch['found'].get(third_party_id)
+        metrics.inc('cloudbeds_duplicate_checks_total', outcome='found' if existing else 'absent')
+        return existing
+
+def cancel_reservation_task(target, credentials, limiter, cancel_event=None, circuit_breaker=None):
+    """Worker body: cancel one reservation under the shared rate limiter and circuit breaker"""
+    if cancel_event is not None and cancel_event.is_set():
+        return {'success': False, 'error': 'Cancelled', 'retries': 0, 'cancelled': True}
+    return make_api_call(
+        PUT_RESERVATION_URL,
+        {},
+        credentials,
+        method='PUT',
+        data={
+            'propertyID': credentials['property_id'],
+            'reservationID': target['reservationID'],
+            'status': 'canceled'
+        },
+        use_form_data=True,
+        circuit_breaker=circuit_breaker,
+        rate_limiter=limiter
+    )
+
+class FillJournal:
+    """SQLite journal of every planned reservation and its outcome
+
+    Outcomes are written in batches by a background thread.
+    """
+
+    # Queued write kinds and the statement each one runs
+    WRITE_STATEMENTS = {
+        'outcome': 'UPDATE reservations SET status = ?, reservation_id = ?, error = ?, updated_at = ? '
+                   'WHERE job_id = ? AND seq = ?',
+        'job': 'UPDATE jobs SET status = ?, updated_at = ? WHERE job_id = ?',
+        'cancellation': "UPDATE reservations SET status = 'cancelled', updated_at = ? "
+                        "WHERE reservation_id = ? AND status = 'created'",
+        'cancellation_failure': "UPDATE reservations SET error = ?, updated_at = ? "
+                                "WHERE reservation_id = ? AND status = 'created'"
+    }
+
+    def __init__(self, path, batch_size=500, flush_interval=0.5):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue()
+        self._init_schema()
+        self.writer = threading.Thread(target=self._writer_loop, name='fill-journal', daemon=True)
+        self.writer.start()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    def _init_schema(self):
+        with self._connect() as conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    job_id TEXT PRIMARY KEY,
+                    property_id TEXT NOT NULL,
+                    request_json TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL,
+                    owner TEXT
+                );
+                CREATE TABLE IF NOT EXISTS reservations (
+                    job_id TEXT NOT NULL,
+                    seq INTEGER NOT NULL,
+                    room_type_id TEXT,
+                    third_party_id TEXT,
+                    stay_length INTEGER,
+                    payload_json TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    reservation_id TEXT,
+                    error TEXT,
+                    updated_at REAL,
+                    PRIMARY KEY (job_id, seq)
+                );
+                CREATE INDEX IF NOT EXISTS idx_reservations_third_party_id ON reservations (third_party_id);
+                CREATE INDEX IF NOT EXISTS idx_reservations_reservation_id ON reservations (reservation_id);
+            """)
+            # Journals written before jobs had owners; their jobs stay visible to no one
+            if 'owner' not in [column[1] for column in conn.execute('PRAGMA table_info(jobs)')]:
+                conn.execute('ALTER TABLE jobs ADD COLUMN owner TEXT')
+
+    def record_plan(self, job_id, property_id, data, tasks, owner=None):
+        """Write the job and every planned reservation before dispatch starts"""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO jobs (job_id, property_id, request_json, status, created_at, updated_at, owner) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (job_id, str(property_id), json.dumps(data), 'running', now, now, owner)
+            )
+            conn.executemany(
+                'INSERT OR REPLACE INTO reservations '
+                '(job_id, seq, room_type_id, third_party_id, stay_length, payload_json, status, updated_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                ((job_id, task['seq'], ','.join(str(room_results['roomTypeID']) for room_results, _ in task['rooms']),
+                  task['reservation_data'].get('thirdPartyIdentifier'), task['stay_length'],
+                  json.dumps(task['reservation_data']), 'pending', now)
+                 for task in tasks)
+            )
+
+    def record_outcome(self, job_id, seq, status, reservation_id=None, error=None):
+        self.queue.put(('outcome', (status, reservation_id, error, time.time(), job_id, seq)))
+
+    def set_job_status(self, job_id, status):
+        self.queue.put(('job', (status, time.time(), job_id)))
+
+    def record_cancellation(self, reservation_id):
+        """Mark the journaled reservation with this server-side ID as removed by a cleanup job"""
+        self.queue.put(('cancellation', (time.time(), str(reservation_id))))
+
+    def record_cancellation_failure(self, reservation_id, error):
+        """Keep why a cleanup could not cancel this reservation; it stays 'created' for the next run"""
+        self.queue.put(('cancellation_failure', (error, time.time(), str(reservation_id))))
+
+    def flush(self):
+        """Block until every queued write has been committed"""
+        self.queue.join()
+
+    def _writer_loop(self):
+        conn = self._connect()
+        while True:
+            batch = [self.queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                with conn:
+                    for kind, params in batch:
+                        conn.execute(self.WRITE_STATEMENTS[kind], params)
+            except sqlite3.Error as e:
+                log.error("Journal write failed (%d records): %s", len(batch), e)
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    def get_job(self, job_id):
+        with self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            row = conn.execute('SELECT * FROM jobs WHERE job_id = ?', (job_id,)).fetchone()
+            return dict(row) if row else None
+
+    def list_jobs(self, owner, limit=20):
+        """Most recent journaled jobs started by owner, with per-status reservation counts"""
+        with self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            rows = conn.execute("""
+                SELECT j.job_id, j.status, j.created_at, j.updated_at,
+                       COUNT(r.seq) AS planned,
+                       COALESCE(SUM(r.status = 'created'), 0) AS created,
+                       COALESCE(SUM(r.status = 'failed'), 0) AS failed,
+                       COALESCE(SUM(r.status = 'pending'), 0) AS pending,
+                       COALESCE(SUM(r.status = 'cancelled'), 0) AS cancelled
+                FROM jobs j LEFT JOIN reservations r ON r.job_id = j.job_id
+                WHERE j.owner = ?
+                GROUP BY j.job_id
+                ORDER BY j.created_at DESC
+                LIMIT ?
+            """, (owner, limit)).fetchall()
+            return [dict(row) for row in rows]
+
+    def created_reservations(self, property_id, job_id=None):
+        """Reservations the journal recorded as created and not yet cleaned up"""
+        query = ("SELECT r.reservation_id, r.third_party_id FROM reservations r JOIN jobs j ON j.job_id = r.job_id "
+                 "WHERE j.property_id = ? AND r.status = 'created' AND r.reservation_id IS NOT NULL "
+                 "AND r.reservation_id != 'N/A'")
+        params = [str(property_id)]
+        if job_id:
+            query += ' AND r.job_id = ?'
+            params.append(job_id)
+        with self._connect() as conn:
+            rows = conn.execute(query + ' ORDER BY r.job_id, r.seq', params).fetchall()
+        return [{'reservationID': reservation_id, 'thirdPartyIdentifier': third_party_id}
+                for reservation_id, third_party_id in rows]
+
+    def page_reservations(self, job_id, after_seq=-1, limit=500, status=None):
+        """One page of a job's per-reservation outcomes in plan order (keyset pagination on seq)"""
+        query = ('SELECT seq, room_type_id, third_party_id, stay_length, status, reservation_id, error, updated_at '
+                 'FROM reservations WHERE job_id = ? AND seq > ?')
+        params = [job_id, after_seq]
+        if status:
+            query += ' AND status = ?'
+            params.append(status)
+        with self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            rows = conn.execute(query + ' ORDER BY seq LIMIT ?', params + [limit]).fetchall()
+            return [dict(row) for row in rows]
+
+    def load_reservations(self, job_id):
+        with self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            rows = conn.execute(
+                'SELECT seq, room_type_id, third_party_id, stay_length, payload_json, status, reservation_id '
+                'FROM reservations WHERE job_id = ? ORDER BY seq', (job_id,)).fetchall()
+            return [dict(row) for row in rows]
+
+fill_journal = FillJournal(FILL_JOURNAL_PATH)
+
+class FairScheduler:
+    """Weighted round-robin hand-out of a fixed number of slots between tenants
+
+    Grant callbacks run under the scheduler lock and must not block.
+    """
+
+    def __init__(self, slots, weights=None, max_per_tenant=0):
+        self.weights = weights or {}
+        self.max_per_tenant = max_per_tenant
+        self.lock = threading.Lock()
+        self.free = slots
+        self.waiting = OrderedDict()  # tenant -> deque of grant callbacks; first key has the turn
+        self.held = Counter()
+        self.turn_grants = 0
+
+    def weight(self, tenant):
+        return max(1, int(self.weights.get(str(tenant), 1)))
+
+    def enqueue(self, tenant, grant):
+        """Call grant() once tenant is given a slot; it must be released afterwards"""
+        with self.lock:
+            self.waiting.setdefault(tenant, deque()).append(grant)
+            self._dispatch()
+
+    def release(self, tenant):
+        with self.lock:
+            self.free += 1
+            self.held[tenant] -= 1
+            if not self.held[tenant]:
+                del self.held[tenant]
+            self._dispatch()
+
+    def withdraw(self, tenant, grant):
+        """Drop a waiter that no longer wants its slot; False if it was already granted"""
+        with self.lock:
+            waiters = self.waiting.get(tenant)
+            if not waiters or grant not in waiters:
+                return False
+            waiters.remove(grant)
+            if not waiters:
+                self._drop(tenant)
+            return True
+
+    def acquire(self, tenant):
+        """Block the calling thread until tenant is given a slot"""
+        granted = threading.Event()
+        self.enqueue(tenant, granted.set)
+        granted.wait()
+
+    async def acquire_async(self, tenant):
+        """acquire() for coroutines on an event loop"""
+        loop = asyncio.get_running_loop()
+        granted = loop.create_future()
+
+        def grant():
+            loop.call_soon_threadsafe(lambda: granted.done() or granted.set_result(None))
+
+        self.enqueue(tenant, grant)
+        try:
+            await granted
+        except asyncio.CancelledError:
+            if not self.withdraw(tenant, grant):
+                self.release(tenant)
+            raise
+
+    def waiting_counts(self):
+        with self.lock:
+            return {tenant: len(waiters) for tenant, waiters in self.waiting.items()}
+
+    def _drop(self, tenant):
+        if next(iter(self.waiting)) == tenant:
+            self.turn_grants = 0
+        del self.waiting[tenant]
+
+    def _dispatch(self):
+        while self.free > 0 and self.waiting:
+            tenant = next((t for t in self.waiting
+                           if not self.max_per_tenant or self.held[t] < self.max_per_tenant), None)
+            if tenant is None:
+                return
+            waiters = self.waiting[tenant]
+            grant = waiters.popleft()
+            self.free -= 1
+            self.held[tenant] += 1
+            grant()
+
+            if not waiters:
+                self._drop(tenant)
+            elif tenant != next(iter(self.waiting)):
+                # Served out of turn because the tenant in turn is at its cap
+                self.waiting.move_to_end(tenant)
+            else:
+                self.turn_grants += 1
+                if self.turn_grants >= self.weight(tenant):
+                    self.waiting.move_to_end(tenant)
+                    self.turn_grants = 0
+
+class LimiterChain:
+    """Several rate limiters acting as one: every call takes a token from each"""
+
+    def __init__(self, *limiters):
+        self.limiters = limiters
+
+    def acquire(self, tokens=1):
+        for limiter in self.limiters:
+            limiter.acquire(tokens)
+
+    async def acquire_async(self, tokens=1):
+        for limiter in self.limiters:
+            await limiter.acquire_async(tokens)
+
+    def available(self):
+        return min(limiter.available() for limiter in self.limiters)
+
+def parse_tenant_weights(spec):
+    """'6000:3,6001:2' -> {'6000': 3, '6001': 2}"""
+    weights = {}
+    for item in filter(None, (part.strip() for part in (spec or '').split(','))):
+        tenant, _, weight = item.rpartition(':')
+        weights[tenant.strip()] = int(weight)
+    return weights
+
+TENANT_WEIGHTS = parse_tenant_weights(os.environ.get('FILL_TENANT_WEIGHTS'))
+
+class FillJob:
+    """State of one background reservation fill"""
+
+    def __init__(self, job_id=None, tenant=None, owner=None):
+        self.id = job_id or uuid.uuid4().hex
+        # Scheduling tenant (property ID) for jobs run by the JobManager
+        self.tenant = tenant
+        # credentials_owner() of whoever started the job; only they can see or control it
+        self.owner = owner
+        self.status = 'queued'
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.result = None
+        self.error = None
+        self.progress = {'total': 0, 'created': 0, 'errors': 0}
+        self.cancel_event = threading.Event()
+        # Rate limiter of the running dispatch, exposed as a metrics gauge
+        self.limiter = None
+        # PhaseTimer of a profiled run
+        self.profiler = None
+        # Starts the job once the JobManager gives it a slot
+        self.admit = None
+        self.lock = threading.Lock()
+        # Bounded ring buffer of progress events for streaming clients
+        self.events = deque(maxlen=JOB_EVENT_BUFFER_SIZE)
+        self.event_seq = 0
+        self.event_cond = threading.Condition(self.lock)
+
+    def update_progress(self, **counts):
+        with self.lock:
+            self.progress.update(counts)
+
+    def publish(self, event_type, **payload):
+        """Append an event to the ring buffer and wake any streaming clients"""
+        with self.event_cond:
+            self.event_seq += 1
+            self.events.append((self.event_seq, event_type, payload))
+            self.event_cond.notify_all()
+
+    def events_since(self, last_seq, timeout):
+        """Return events newer than last_seq, waiting up to timeout for one to arrive"""
+        with self.event_cond:
+            if self.event_seq <= last_seq and self.status not in JobManager.FINISHED_STATES:
+                self.event_cond.wait(timeout)
+            return [e for e in self.events if e[0] > last_seq]
+
+    def to_dict(self):
+        with self.lock:
+            return {
+                'job_id': self.id,
+                'tenant': self.tenant,
+                'status': self.status,
+                'created_at': self.created_at,
+                'started_at': self.started_at,
+                'finished_at': self.finished_at,
+                'progress': dict(self.progress),
+                'error': self.error
+            }
+
+class JobManager:
+    """Runs each fill job on its own thread, queueing a tenant's jobs beyond max_jobs_per_tenant
+
+    max_concurrent_jobs (0 = none) is only a process-wide safety ceiling.
+    """
+
+    FINISHED_STATES = ('completed', 'failed', 'cancelled')
+
+    def __init__(self, max_concurrent_jobs, retention_seconds, max_jobs_per_tenant=0, tenant_weights=None,
+                 tenant_requests_per_second=0):
+        self.jobs = {}
+        self.lock = threading.Lock()
+        self.retention_seconds = retention_seconds
+        self.admission = FairScheduler(max_concurrent_jobs or float('inf'), tenant_weights, max_jobs_per_tenant)
+        self.tenant_requests_per_second = tenant_requests_per_second
+        self.tenant_limiters = {}
+
+    def submit(self, func, *args, job_id=None, tenant=None, owner=None):
+        """Queue func(job, *args) for tenant; its return value becomes the job result"""
+        job = FillJob(job_id, tenant, owner)
+        job.admit = lambda: threading.Thread(target=self._run, args=(job, func, args),
+                                             name=f"fill-job-{job.id[:8]}", daemon=True).start()
+        with self.lock:
+            self._prune()
+            self.jobs[job.id] = job
+        self.admission.enqueue(tenant, job.admit)
+        return job
+
+    def tenant_limiter(self, tenant):
+        """Rate limiter shared by every job of tenant, or None without a tenant quota"""
+        if not self.tenant_requests_per_second:
+            return None
+        with self.lock:
+            limiter = self.tenant_limiters.get(tenant)
+            if limiter is None:
+                limiter = self.tenant_limiters[tenant] = TokenBucket(self.tenant_requests_per_second,
+                                                                     self.tenant_requests_per_second)
+            return limiter
+
+    def _run(self, job, func, args):
+        try:
+            if job.cancel_event.is_set():
+                job.status = 'cancelled'
+                job.finished_at = time.time()
+                return
+            job.status = 'running'
+            job.started_at = time.time()
+            job.publish('status', status=job.status)
+            try:
+                job.result = func(job, *args)
+                job.status = 'cancelled' if job.cancel_event.is_set() else 'completed'
+            except Exception as e:
+                log.exception("Critical error in job %s", job.id)
+                job.error = str(e)
+                job.status = 'failed'
+            finally:
+                job.finished_at = time.time()
+                job.publish('status', status=job.status, error=job.error)
+        finally:
+            self.admission.release(job.tenant)
+
+    def get(self, job_id, owner=None):
+        """The job, or None if it doesn't exist or (with owner) belongs to someone else"""
+        with self.lock:
+            job = self.jobs.get(job_id)
+        if job is None or (owner is not None and job.owner != owner):
+            return None
+        return job
+
+    def cancel(self, job_id, owner=None):
+        job = self.get(job_id, owner)
+        if job and job.status not in self.FINISHED_STATES:
+            job.cancel_event.set()
+            # A job still waiting for a slot is cancelled on the spot
+            if job.status == 'queued' and self.admission.withdraw(job.tenant, job.admit):
+                job.status = 'cancelled'
+                job.finished_at = time.time()
+                job.publish('status', status=job.status, error=None)
+        return job
+
+    def _prune(self):
+        cutoff = time.time() - self.retention_seconds
+        for job_id in [j.id for j in self.jobs.values()
+                       if j.status in self.FINISHED_STATES and j.finished_at and j.finished_at < cutoff]:
+            del self.jobs[job_id]
+
+job_manager = JobManager(
+    max_concurrent_jobs=int(os.environ.get('FILL_JOB_MAX_CONCURRENT', 0)),
+    retention_seconds=int(os.environ.get('FILL_JOB_RETENTION_SECONDS', 24 * 3600)),
+    max_jobs_per_tenant=int(os.environ.get('FILL_TENANT_MAX_JOBS', 1)),
+    tenant_weights=TENANT_WEIGHTS,
+    tenant_requests_per_second=float(os.environ.get('FILL_TENANT_MAX_RPS', 0))
+)
+
+# In-flight API calls across all jobs, handed out to tenants in weighted round-robin
+call_slots = FairScheduler(
+    int(os.environ.get('FILL_MAX_IN_FLIGHT', 256)),
+    TENANT_WEIGHTS,
+    int(os.environ.get('FILL_TENANT_MAX_IN_FLIGHT', 0))
+)
+
+def with_call_slot(job, func):
+    """Wrap a dispatch function so each call holds one of the tenant's fair API call slots"""
+    if job.tenant is None:
+        return func
+
+    def call(item):
+        with timed(job.profiler, 'call_slot_wait'):
+            call_slots.acquire(job.tenant)
+        try:
+            return func(item)
+        finally:
+            call_slots.release(job.tenant)
+    return call
+
+def with_call_slot_async(job, coro_func):
+    """with_call_slot for coroutine dispatch functions"""
+    if job.tenant is None:
+        return coro_func
+
+    async def call(item):
+        with timed(job.profiler, 'call_slot_wait', cpu=False):
+            await call_slots.acquire_async(job.tenant)
+        try:
+            return await coro_func(item)
+        finally:
+            call_slots.release(job.tenant)
+    return call
+
+def job_rate_limiter(job, requests_per_second, burst):
+    """The job's own token bucket, chained with its tenant's shared quota if there is one"""
+    job.limiter = TokenBucket(requests_per_second, burst)
+    tenant_limiter = job_manager.tenant_limiter(job.tenant) if job.tenant is not None else None
+    return LimiterChain(job.limiter, tenant_limiter) if tenant_limiter else job.limiter
+
+def _jobs_in_flight():
+    with job_manager.lock:
+        statuses = [job.status for job in job_manager.jobs.values()]
+    return [({'status': status}, statuses.count(status)) for status in ('queued', 'running')]
+
+def _rate_limiter_tokens():
+    with job_manager.lock:
+        jobs = [job for job in job_manager.jobs.values() if job.status == 'running' and job.limiter]
+    return [({'job_id': job.id}, round(job.limiter.available(), 3)) for job in jobs]
+
+def _jobs_waiting():
+    return [({'tenant': str(tenant)}, count) for tenant, count in job_manager.admission.waiting_counts().items()]
+
+def _api_calls_waiting():
+    return [({'tenant': str(tenant)}, count) for tenant, count in call_slots.waiting_counts().items()]
+
+metrics.gauge('fill_jobs_in_flight', 'Fill jobs queued or running in this process', _jobs_in_flight)
+metrics.gauge('cloudbeds_rate_limiter_tokens', 'Tokens currently available to each running fill job', _rate_limiter_tokens)
+metrics.gauge('fill_jobs_waiting', 'Queued fill jobs waiting for a job slot, by tenant', _jobs_waiting)
+metrics.gauge('fill_api_calls_waiting', 'API calls waiting for an in-flight slot, by tenant', _api_calls_waiting)
 
 # Routes
 @app.route('/')
@@ -286,7 +2637,7 @@ def test_connection():
         if not credentials['access_token']:
             return jsonify({'success': False, 'error': 'Please configure your access token first.'})
         
-        result = make_api_call(ROOM_TYPES_URL, {'propertyID': credentials['property_id']}, credentials)
+        result = get_room_types_response(credentials, refresh=bool(request.args.get('refresh')))
         
         if result['success']:
             return jsonify({'success': True, 'message': 'Connection successful!'})
@@ -304,298 +2655,571 @@ def get_room_types():
         if not credentials['access_token']:
             return jsonify({'success': False, 'error': 'Access token not configured'})
         
-        response = make_api_call(ROOM_TYPES_URL, {'propertyID': credentials['property_id']}, credentials)
+        response = get_room_types_response(credentials, refresh=bool(request.args.get('refresh')))
         
         if not response['success']:
             return jsonify({'success': False, 'error': response['error']})
         
-        # Extract room types data
-        data = response['data']
-        room_types = []
-        
-        if isinstance(data, dict) and 'data' in data:
-            room_types = data['data']
-        elif isinstance(data, list):
-            room_types = data
-        
-        # Process room types to extract needed fields
-        processed_room_types = []
-        for rt in room_types:
-            if rt:
-                processed_room_types.append({
-                    'roomTypeID': rt.get('roomTypeID'),
-                    'roomTypeName': rt.get('roomTypeName'),
-                    'roomTypeUnits': rt.get('roomTypeUnits', 0),
-                    'maxGuests': rt.get('maxGuests', 1)
-                })
-        
         return jsonify({
             'success': True,
-            'data': processed_room_types
+            'data': extract_room_types(response['data'])
         })
         
     except Exception as e:
-        print(f"Error in get_room_types: {e}")
+        log.error("Error in get_room_types: %s", e)
         return jsonify({'success': False, 'error': str(e)})
 
 @app.route('/api/create-reservations', methods=['POST'])
 def create_reservations():
+    """Validate the fill request and queue it as a background job (or plan it, with dryRun)"""
     try:
-        print("\n" + "="*80, flush=True)
-        print("STARTING RESERVATION CREATION PROCESS", flush=True)
-        print("="*80, flush=True)
-
         credentials = get_credentials()
+        data = request.get_json() or {}
+
+        if not data.get('startDate') or not data.get('endDate'):
+            return jsonify({'success': False, 'error': 'Start date and end date are required'})
+
+        # Cheap to build (the expected stay length is only computed for a dry run's report)
+        try:
+            profiles = stay_profiles(data)
+        except (TypeError, ValueError) as e:
+            return jsonify({'success': False, 'error': f'Invalid stay profile: {e}'})
+
+        settings_error = dispatch_settings_error(data)
+        if settings_error:
+            return jsonify({'success': False, 'error': settings_error}), 400
 
         if not credentials['access_token']:
             return jsonify({'success': False, 'error': 'Access token not configured'})
 
-        # Get available source ID
-        source_id = get_available_sources(credentials)
-        print(f"\n→ Will use sourceID for all reservations: {source_id}", flush=True)
+        # Plan-only mode runs on the request thread, so its size is capped
+        if data.get('dryRun'):
+            _, num_days = fill_window(data)
+            units = sum(int(config.get('roomTypeUnits', 0)) for config in data.get('roomTypeConfigs', [])
+                        if config.get('percentage', 0) > 0)
+            if num_days * max(units, 1) > DRY_RUN_MAX_ROOM_NIGHTS:
+                return jsonify({'success': False, 'error': f'Dry run covers {num_days} nights x {units} units; '
+                                                           f'the limit is {DRY_RUN_MAX_ROOM_NIGHTS} room-nights'}), 400
+            try:
+                plan = run_dry_run(data, credentials['property_id'], bool(data.get('includeReservations')),
+                                   DRY_RUN_MAX_RESERVATIONS, profiles)
+            except ValueError as e:
+                return jsonify({'success': False, 'error': str(e)}), 400
+            return jsonify({'success': True, 'data': plan})
 
-        if not source_id:
-            error_msg = "CRITICAL: No source ID available! Cannot create reservations."
-            print(f"\n✗ {error_msg}", flush=True)
-            return jsonify({'success': False, 'error': error_msg})
+        job = job_manager.submit(run_reservation_fill, credentials, data, tenant=str(credentials['property_id']),
+                                 owner=credentials_owner(credentials))
+        log.info("Queued reservation fill job %s", job.id)
 
-        data = request.get_json()
-        room_type_configs = data.get('roomTypeConfigs', [])
-        start_date = data.get('startDate')
-        end_date = data.get('endDate')
-        allotment_block_code = data.get('allotmentBlockCode')
+        return jsonify({'success': True, 'data': {'job_id': job.id, 'status': job.status}})
 
-        if not start_date or not end_date:
-            return jsonify({'success': False, 'error': 'Start date and end date are required'})
+    except Exception as e:
+        log.exception("Error queueing reservation fill")
+        return jsonify({'success': False, 'error': str(e)})
 
-        print(f"→ Date Range: {start_date} to {end_date}", flush=True)
-        print(f"→ Room Types to Process: {len(room_type_configs)}", flush=True)
-
-        # Calculate total expected reservations using the new formula
-        # This is just for estimation - actual calculation happens in the loop
-        start_dt_calc = datetime.strptime(start_date, '%Y-%m-%d')
-        end_dt_calc = datetime.strptime(end_date, '%Y-%m-%d')
-        num_days_calc = (end_dt_calc - start_dt_calc).days
-        # CRITICAL: Must match actual average for uniform distribution 1-7 nights = 4.0 nights
-        average_stay_length_calc = 4.0
-
-        total_expected = 0
-        for cfg in room_type_configs:
-            if cfg.get('percentage', 0) > 0:
-                total_room_nights = num_days_calc * cfg.get('roomTypeUnits', 0)
-                target_room_nights = total_room_nights * (cfg.get('percentage', 0) / 100)
-                reservations_for_room_type = max(1, int(target_room_nights / average_stay_length_calc))
-                total_expected += reservations_for_room_type
-
-        print(f"→ Total Reservations to Create (estimated): {total_expected}", flush=True)
-        print(f"→ Estimated time: ~{int(total_expected * 0.3 / 60)} minutes ({total_expected * 0.3:.0f} seconds with 0.3s delays)\n", flush=True)
-
-        results = []
-        total_created = 0
-        total_errors = 0
-        
-        # Calculate date range in days
-        start_dt = datetime.strptime(start_date, '%Y-%m-%d')
-        end_dt = datetime.strptime(end_date, '%Y-%m-%d')
-        num_days = (end_dt - start_dt).days
+@app.route('/metrics')
+def prometheus_metrics():
+    """Prometheus scrape endpoint"""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+def owned_job(job_id):
+    """The in-memory job if the session's credentials started it, else None"""
+    owner = credentials_owner(get_credentials())
+    return job_manager.get(job_id, owner) if owner else None
+
+def owned_journaled_job(job_id):
+    """The journaled job if the session's credentials started it, else None"""
+    owner = credentials_owner(get_credentials())
+    journaled = fill_journal.get_job(job_id) if owner else None
+    return journaled if journaled and journaled['owner'] == owner else None
+
+@app.route('/api/jobs')
+def list_jobs():
+    """Journaled fill jobs started with the session's credentials, newest first"""
+    owner = credentials_owner(get_credentials())
+    jobs = fill_journal.list_jobs(owner) if owner else []
+    for journaled in jobs:
+        active = job_manager.get(journaled['job_id'])
+        journaled['active'] = bool(active and active.status not in JobManager.FINISHED_STATES)
+        journaled['resumable'] = not journaled['active'] and (journaled['pending'] + journaled['failed']) > 0
+    return jsonify({'success': True, 'data': jobs})
+
+@app.route('/api/jobs/<job_id>/reservations')
+def list_job_reservations(job_id):
+    """Paginated per-reservation outcome log for a journaled job
+
+    Query parameters: after (last seq of the previous page), limit (max
+    1000) and status (pending, created, failed or cancelled).
+    """
+    journaled = owned_journaled_job(job_id)
+    if not journaled:
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
 
-        print(f"→ Date range: {num_days} days ({start_date} to {end_date})", flush=True)
+    try:
+        after_seq = int(request.args.get('after', -1))
+        limit = min(max(int(request.args.get('limit', 500)), 1), 1000)
+    except ValueError:
+        return jsonify({'success': False, 'error': 'after and limit must be integers'}), 400
+
+    # Outcomes reach the journal within the writer's flush interval (~0.5s)
+    rows = fill_journal.page_reservations(job_id, after_seq, limit, request.args.get('status'))
+    return jsonify({'success': True, 'data': {
+        'reservations': rows,
+        'next_after': rows[-1]['seq'] if len(rows) == limit else None
+    }})
+
+@app.route('/api/jobs/<job_id>/resume', methods=['POST'])
+def resume_job(job_id):
+    """Re-queue an interrupted job, sending only reservations not yet created"""
+    credentials = get_credentials()
+    if not credentials['access_token']:
+        return jsonify({'success': False, 'error': 'Access token not configured'})
+
+    journaled = owned_journaled_job(job_id)
+    if not journaled:
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+
+    active = job_manager.get(job_id)
+    if active and active.status not in JobManager.FINISHED_STATES:
+        return jsonify({'success': False, 'error': f'Job is still {active.status}'})
+
+    data = json.loads(journaled['request_json'])
+    settings_error = dispatch_settings_error(data)
+    if settings_error:
+        return jsonify({'success': False, 'error': settings_error}), 400
+    job = job_manager.submit(run_reservation_fill, credentials, data, True, job_id=job_id,
+                             tenant=str(credentials['property_id']), owner=journaled['owner'])
+    log.info("Resuming reservation fill job %s", job.id)
+    return jsonify({'success': True, 'data': {'job_id': job.id, 'status': job.status}})
+
+@app.route('/api/cleanup', methods=['POST'])
+def cleanup_reservations():
+    """Queue a job that cancels reservations created by earlier fills"""
+    credentials = get_credentials()
+    if not credentials['access_token']:
+        return jsonify({'success': False, 'error': 'Access token not configured'})
+
+    data = request.get_json() or {}
+    if data.get('source', 'journal') not in ('journal', 'api'):
+        return jsonify({'success': False, 'error': "source must be 'journal' or 'api'"})
+    if data.get('source') == 'api' and not data.get('prefix', DEMO_ID_PREFIX):
+        return jsonify({'success': False, 'error': 'A thirdPartyIdentifier prefix is required'})
+    settings_error = dispatch_settings_error(data)
+    if settings_error:
+        return jsonify({'success': False, 'error': settings_error}), 400
+
+    job = job_manager.submit(run_reservation_cleanup, credentials, data, tenant=str(credentials['property_id']),
+                             owner=credentials_owner(credentials))
+    log.info("Queued reservation cleanup job %s", job.id)
+    return jsonify({'success': True, 'data': {'job_id': job.id, 'status': job.status}})
+
+@app.route('/api/jobs/<job_id>')
+def get_job_status(job_id):
+    job = owned_job(job_id)
+    if not job:
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+    return jsonify({'success': True, 'data': job.to_dict()})
+
+_event_stream_waiters = threading.BoundedSemaphore(max(1, JOB_EVENT_MAX_WAITING))
+
+@app.route('/api/jobs/<job_id>/events')
+def stream_job_events(job_id):
+    """Server-Sent Events of per-reservation progress for a job, as a bounded long-poll
+
+    Answers 204 once the job has finished and the client has every event.
+    """
+    job = owned_job(job_id)
+    if not job:
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
 
-        for config in room_type_configs:
-            room_type_id = config.get('roomTypeID')
-            room_type_name = config.get('roomTypeName')
-            room_type_units = config.get('roomTypeUnits', 0)
-            percentage = config.get('percentage', 0)
+    try:
+        last_seq = int(request.headers.get('Last-Event-ID') or request.args.get('since') or 0)
+    except ValueError:
+        last_seq = 0
 
-            if percentage <= 0:
-                continue
+    can_wait = _event_stream_waiters.acquire(blocking=False)
+    try:
+        events = job.events_since(last_seq, timeout=JOB_EVENT_POLL_SECONDS if can_wait else 0)
+    finally:
+        if can_wait:
+            _event_stream_waiters.release()
+    if not events and job.status in JobManager.FINISHED_STATES:
+        return Response(status=204)
+
+    body = [f"retry: {JOB_EVENT_RETRY_MS}\n\n"]
+    for seq, event_type, payload in events:
+        body.append(f"id: {seq}\nevent: {event_type}\ndata: {json.dumps(payload)}\n\n")
+    return Response(''.join(body), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
 
-            # Calculate number of reservations to create based on room-nights
-            # Formula: (total room-nights available * percentage) / actual average stay length
-            # This ensures the occupancy percentage is achieved on EACH DATE
-            #
-            # Example: 100 rooms, 7 days, 50% target occupancy
-            #   - Total room-nights available: 7 * 100 = 700
-            #   - Target: 50% * 700 = 350 room-nights
-            #   - Actual average stay for random 1-7 nights: (1+2+3+4+5+6+7)/7 = 4 nights
-            #   - Reservations needed: 350 / 4 = 87.5 ≈ 88 reservations
-            #   - Result: 88 reservations * 4 nights avg = 352 room-nights / 7 days = 50.3 rooms per night ≈ 50%
-
-            total_room_nights_available = num_days * room_type_units
-            target_room_nights = total_room_nights_available * (percentage / 100)
-
-            # CRITICAL: Use the actual mathematical average for uniform random distribution (1-7 nights)
-            # The mathematical expectation is (1+2+3+4+5+6+7)/7 = 4 nights
-            # Using any other value will cause occupancy mismatch!
-            average_stay_length = 4.0
-            num_reservations = max(1, int(round(target_room_nights / average_stay_length)))
-
-            # Add explanation in the log
-            print(f"\n{'='*80}", flush=True)
-            print(f"CALCULATION FOR {room_type_name}:", flush=True)
-            print(f"  • Room Units: {room_type_units}", flush=True)
-            print(f"  • Date Range: {num_days} days", flush=True)
-            print(f"  • Total Room-Nights Available: {total_room_nights_available}", flush=True)
-            print(f"  • Target Occupancy PER NIGHT: {percentage}%", flush=True)
-            print(f"  • Target Rooms Per Night: {room_type_units * (percentage / 100):.1f} rooms", flush=True)
-            print(f"  • Total Room-Nights to Fill: {target_room_nights:.1f}", flush=True)
-            print(f"  • Average Stay Length (1-7 nights uniform): {average_stay_length} nights", flush=True)
-            print(f"  • Reservations to Create: {num_reservations}", flush=True)
-            expected_occupancy = (num_reservations * average_stay_length / total_room_nights_available * 100)
-            expected_rooms_per_night = num_reservations * average_stay_length / num_days
-            print(f"  • Expected Result: {expected_rooms_per_night:.1f} rooms per night ({expected_occupancy:.1f}% occupancy)", flush=True)
-            print(f"{'='*80}", flush=True)
-            
-            room_results = {
-                'roomTypeID': room_type_id,
-                'roomTypeName': room_type_name,
-                'requested': num_reservations,
-                'created': 0,
-                'errors': [],
-                'stay_lengths': []  # Track stay lengths for statistics
-            }
-            
-            # Create reservations for this room type
-            print(f"\n{'='*80}", flush=True)
-            print(f"STARTING CREATION FOR: {room_type_name}", flush=True)
-            print(f"{'='*80}\n", flush=True)
+@app.route('/api/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    owner = credentials_owner(get_credentials())
+    job = job_manager.cancel(job_id, owner) if owner else None
+    if not job:
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+    return jsonify({'success': True, 'data': job.to_dict()})
+
+@app.route('/api/jobs/<job_id>/result')
+def get_job_result(job_id):
+    job = owned_job(job_id)
+    if not job:
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+    if job.status == 'failed':
+        return jsonify({'success': False, 'error': job.error})
+    if job.result is None:
+        return jsonify({'success': False, 'error': f'Job is still {job.status}'})
+    return jsonify({'success': True, 'data': job.result})
+
+_EXHAUSTED = object()
+
+def iter_dispatch(func, items, max_workers, cancel_event, window=None, thread_name_prefix='dispatch'):
+    """Run func(item) on a worker pool, yielding (item, result) as each finishes
+
+    At most `window` items (default four per worker) are queued or running
+    at once, so lazily generated items are never all held in memory. Once
+    cancel_event is set no further items are submitted; those in flight
+    still finish and are yielded.
+    """
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=thread_name_prefix) as executor:
+        yield from _iter_windowed(lambda item: executor.submit(func, item), items,
+                                  window or max_workers * 4, cancel_event)
+
+def iter_dispatch_async(coro_func, items, max_in_flight, cancel_event):
+    """iter_dispatch for coroutines: up to max_in_flight coro_func(item) calls run on the API event loop
+
+    The caller's thread only generates items and handles results; every
+    in-flight call is a coroutine on the one event-loop thread.
+    """
+    event_loop = get_event_loop_thread()
+    yield from _iter_windowed(lambda item: event_loop.submit(coro_func(item)), items, max_in_flight, cancel_event)
+
+def _iter_windowed(submit, items, window, cancel_event):
+    """Keep up to `window` submitted futures pending, yielding (item, result) as each completes"""
+    items = iter(items)
+    exhausted = False
+    pending = {}
+    while True:
+        while not exhausted and len(pending) < window and not cancel_event.is_set():
+            item = next(items, _EXHAUSTED)
+            if item is _EXHAUSTED:
+                exhausted = True
+                break
+            pending[submit(item)] = item
+        if not pending:
+            return
+
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            item = pending.pop(future)
+            try:
+                result = future.result()
+            except Exception as e:
+                log.exception("Dispatch task failed")
+                result = {'success': False, 'error': str(e)}
+            yield item, result
+
+def dispatch_settings_error(data):
+    """Why a job request's requestsPerSecond or burst is unusable, or None
+
+    The token bucket would clamp a non-positive rate to a crawl instead of failing.
+    """
+    for key in ('requestsPerSecond', 'burst'):
+        value = data.get(key)
+        if value is None:
+            continue
+        try:
+            valid = not isinstance(value, bool) and math.isfinite(float(value)) and float(value) > 0
+        except (TypeError, ValueError):
+            valid = False
+        if not valid:
+            return f'{key} must be a positive number'
+    return None
+
+def dispatch_settings(data):
+    """(max_workers, requests_per_second, burst) from a job request, with server defaults"""
+    max_workers = max(1, int(data.get('maxWorkers') or DEFAULT_MAX_WORKERS))
+    # More workers than pooled connections would make urllib3 discard and re-open connections
+    if max_workers > HTTP_POOL_SIZE:
+        log.warning("maxWorkers %d exceeds the connection pool (CLOUDBEDS_POOL_SIZE=%d) - using %d workers",
+                    max_workers, HTTP_POOL_SIZE, HTTP_POOL_SIZE)
+        max_workers = HTTP_POOL_SIZE
+    requests_per_second = float(data.get('requestsPerSecond') or DEFAULT_REQUESTS_PER_SECOND)
+    burst = max(1, int(data.get('burst') or DEFAULT_BURST))
+    return max_workers, requests_per_second, burst
+
+def new_circuit_breaker():
+    return CircuitBreaker(
+        failure_threshold=int(os.environ.get('CLOUDBEDS_BREAKER_THRESHOLD', 5)),
+        cooldown=float(os.environ.get('CLOUDBEDS_BREAKER_COOLDOWN', 10))
+    )
+
+def run_reservation_fill(job, credentials, data, resume=False):
+    """Plan and create all reservations for one fill request (runs on a job thread)
+
+    With resume=True only reservations not yet confirmed as created are sent.
+    """
+    if not data.get('profile'):
+        return _fill_reservations(job, credentials, data, resume)
+
+    job.profiler = PhaseTimer()
+    sampler = None
+    if data.get('profileSampling'):
+        # The job thread plus its dispatch workers, or the shared API event loop with asyncDispatch
+        job_thread = threading.get_ident()
+        dispatch_thread = 'api-event-loop' if data.get('asyncDispatch') else f"dispatch-{job.id[:8]}"
+        sampler = StackSampler(lambda thread: thread.ident == job_thread
+                               or thread.name.startswith(dispatch_thread)).start()
+    try:
+        result = _fill_reservations(job, credentials, data, resume)
+    finally:
+        if sampler is not None:
+            sampler.stop()
+
+    result['profile'] = job.profiler.report()
+    if sampler is not None:
+        result['profile']['sampling'] = sampler.report()
+    log.info("Job %s profile: %s-bound, %s", job.id, result['profile']['bottleneck'],
+             ', '.join(f"{name} {phase['wall_seconds']}s" for name, phase in result['profile']['phases'].items()))
+    return result
+
+def _fill_reservations(job, credentials, data, resume):
+    max_workers, requests_per_second, burst = dispatch_settings(data)
+
+    limiter = job_rate_limiter(job, requests_per_second, burst)
+    profiler = job.profiler
+
+    if resume:
+        log.info("Resuming reservation creation process (job %s)", job.id)
+        with timed(profiler, 'journal_load'):
+            results, tasks = load_journaled_tasks(job.id)
+        fill_journal.set_job_status(job.id, 'running')
+        with timed(profiler, 'resume_reconcile'):
+            tasks = reconcile_resumed_tasks(job, credentials, tasks, limiter)
+    else:
+        results, tasks = plan_reservation_tasks(job, credentials, data, requests_per_second, limiter)
+        with timed(profiler, 'plan_journal'):
+            fill_journal.record_plan(job.id, credentials['property_id'], data, tasks, credentials_owner(credentials))
+
+    # Progress counts room-stays; a multi-room reservation advances it by its room count
+    total_created = sum(r['created'] for r in results)
+    total_errors = 0
+    reservations_created = 0
+    if resume:
+        total_expected = total_created + sum(quantity for task in tasks for _, quantity in task['rooms'])
+    else:
+        total_expected = sum(r['requested'] for r in results)
+
+    log.info("Dispatching %d reservations (workers: %d, rate limit: %s req/s, burst %d)",
+             len(tasks), max_workers, requests_per_second, burst)
+
+    circuit_breaker = new_circuit_breaker()
+    duplicate_guard = DuplicateGuard(credentials, limiter)
+    results_lock = threading.Lock()
+    job.update_progress(total=total_expected, created=total_created)
+    dispatch_started = time.monotonic()
+    dispatch_cpu_started = time.thread_time()
+    created_before = total_created
+
+    # Payloads are generated lazily as the dispatch window pulls tasks
+    if profiler is not None:
+        tasks = profiler.iterate('payload_generation', tasks)
+
+    if data.get('asyncDispatch'):
+        max_in_flight = max(1, int(data.get('maxInFlight') or DEFAULT_MAX_IN_FLIGHT))
+        log.info("Dispatching on the API event loop with up to %d calls in flight", max_in_flight)
+        dispatched = iter_dispatch_async(
+            with_call_slot_async(job, lambda task: post_reservation_task_async(
+                task, credentials, limiter, job.cancel_event, circuit_breaker, duplicate_guard, profiler)),
+            tasks, max_in_flight, job.cancel_event)
+    else:
+        dispatched = iter_dispatch(
+            with_call_slot(job, lambda task: post_reservation_task(
+                task, credentials, limiter, job.cancel_event, circuit_breaker, duplicate_guard, profiler)),
+            tasks, max_workers, job.cancel_event, thread_name_prefix=f"dispatch-{job.id[:8]}")
+
+    cancelling = False
+    for task, result in dispatched:
+        if job.cancel_event.is_set() and not cancelling:
+            # Unsent reservations stay pending in the journal for a later resume
+            log.warning("Job %s cancelled - dropping queued reservations", job.id)
+            cancelling = True
+        if result.get('cancelled'):
+            continue
+
+        rooms = task['rooms']
+        room_results = rooms[0][0]
+        room_type_name = rooms_label(rooms)
+        i = task['index']
+        num_reservations = task['num_reservations']
+
+        with results_lock, timed(profiler, 'result_logging'):
+            room_results['retries'] += result.get('retries', 0)
+            if result['success']:
+                reservation_id = 'N/A'
+                if 'data' in result and result['data']:
+                    reservation_id = result['data'].get('reservationID', 'N/A')
+                for booked_results, quantity in rooms:
+                    record_created_stay(booked_results, task['stay_length'], quantity)
+                    total_created += quantity
+                    metrics.inc('cloudbeds_reservations_total', quantity,
+                                room_type=booked_results['roomTypeName'], outcome='created')
+                reservations_created += 1
+                fill_journal.record_outcome(job.id, task['seq'], 'created', reservation_id=str(reservation_id))
+                reservation_log.info(
+                    "[%s] Reservation %d/%d created (ID: %s) | Total: %d/%d",
+                    room_type_name, i, num_reservations, reservation_id, total_created, total_expected,
+                    extra={'job_id': job.id, 'room_type_id': room_results['roomTypeID'], 'reservation_id': reservation_id}
+                )
+            else:
+                for failed_results, quantity in rooms:
+                    record_failure(failed_results, result['error'], quantity)
+                    total_errors += quantity
+                    metrics.inc('cloudbeds_reservations_total', quantity,
+                                room_type=failed_results['roomTypeName'], outcome='failed')
+                fill_journal.record_outcome(job.id, task['seq'], 'failed', error=result['error'])
+                reservation_log.warning(
+                    "[%s] Reservation %d: %s", room_type_name, i, result['error'],
+                    extra={'job_id': job.id, 'room_type_id': room_results['roomTypeID']}
+                )
+
+            job.update_progress(created=total_created, errors=total_errors)
+
+            # Running throughput and ETA for streaming clients
+            completed = total_created + total_errors
+            elapsed = time.monotonic() - dispatch_started
+            rate = (completed - created_before) / elapsed if elapsed > 0 else 0.0
+            job.publish(
+                'reservation',
+                outcome='created' if result['success'] else 'failed',
+                roomTypeID=room_results['roomTypeID'],
+                roomTypeName=room_type_name,
+                error=None if result['success'] else result['error'],
+                created=total_created,
+                errors=total_errors,
+                total=total_expected,
+                rate=round(rate, 2),
+                eta_seconds=round((total_expected - completed) / rate, 1) if rate > 0 else None
+            )
+
+    if profiler is not None:
+        profiler.record('dispatch', time.monotonic() - dispatch_started, time.thread_time() - dispatch_cpu_started)
+
+    fill_journal.set_job_status(job.id, 'cancelled' if job.cancel_event.is_set() else 'completed')
+    fill_journal.flush()
+
+    # Log final summary
+    log.info("Reservation creation complete (job %s): %d created, %d errors",
+             job.id, total_created, total_errors,
+             extra={'job_id': job.id, 'total_created': total_created, 'total_errors': total_errors})
+    for result in results:
+        details = [f"{result['created']}/{result['requested']} created"]
+        if result['failed']:
+            details.append(f"{result['failed']} errors")
+        if result['retries']:
+            details.append(f"{result['retries']} retries")
+
+        # Stay length statistics
+        stay_counts = [(nights, count) for nights, count in enumerate(result['stay_length_histogram']) if count]
+        if stay_counts:
+            avg_stay = sum(nights * count for nights, count in stay_counts) / result['created']
+            distribution = ', '.join([f"{nights}n: {count}" for nights, count in stay_counts])
+            details.append(f"stays {stay_counts[0][0]}-{stay_counts[-1][0]} nights (avg {avg_stay:.1f}; {distribution})")
+        log.info("  - %s: %s", result['roomTypeName'], ', '.join(details))
 
-            for i in range(num_reservations):
-                try:
-                    print(f"\n[{room_type_name}] Processing reservation {i+1}/{num_reservations}", flush=True)
-
-                    # Calculate overall progress
-                    total_completed_so_far = total_created + total_errors
-                    if total_expected > 0:
-                        progress_pct = int((total_completed_so_far / total_expected) * 100)
-                        print(f"Overall progress: {total_completed_so_far}/{total_expected} ({progress_pct}% complete)", flush=True)
-                    else:
-                        print(f"Overall progress: {total_completed_so_far} completed", flush=True)
-
-                    # Generate random guest data
-                    first_name, last_name = generate_random_name()
-                    email = generate_random_email(first_name, last_name)
-                    checkin_date, checkout_date, stay_length = generate_reservation_dates(start_date, end_date)
-
-                    # Prepare reservation data according to Cloudbeds API schema
-                    import json
-
-                    reservation_data = {
-                        'propertyID': credentials['property_id'],
-                        'startDate': checkin_date,
-                        'endDate': checkout_date,
-                        'guestFirstName': first_name,
-                        'guestLastName': last_name,
-                        'guestEmail': email,
-                        'guestCountry': 'US',
-                        'guestZip': '12345',
-                        'guestPhone': f'{random.randint(2000000000, 9999999999)}',
-                        'guestGender': 'M',  # Default gender
-                        'paymentMethod': 'ebanking',
-                        'sourceID': source_id,
-                        'thirdPartyIdentifier': f'demo-{random.randint(10000, 99999)}',
-                        'sendEmailConfirmation': False,
-                        # Convert arrays to JSON strings as required by the API
-                        'rooms': json.dumps([{"roomTypeID": room_type_id, "quantity": 1}]),
-                        'adults': json.dumps([{"quantity": 1, "roomTypeID": room_type_id}]),
-                        'children': json.dumps([{"roomTypeID": room_type_id, "quantity": 0}])
-                    }
-
-                    if allotment_block_code:
-                        reservation_data['allotmentBlockCode'] = allotment_block_code
-
-                    # Make API call to create reservation
-                    print(f"→ Creating reservation for {first_name} {last_name}", flush=True)
-                    print(f"  Check-in: {checkin_date} | Check-out: {checkout_date} | Stay: {stay_length} night{'s' if stay_length != 1 else ''}", flush=True)
-                    print(f"  Using sourceID: {source_id}", flush=True)
-
-                    result = make_api_call(
-                        POST_RESERVATION_URL,
-                        {},  # No query params for POST
-                        credentials,
-                        method='POST',
-                        data=reservation_data,
-                        use_form_data=True  # Use form-encoded data for postReservation
-                    )
-
-                    if result['success']:
-                        reservation_id = 'N/A'
-                        if 'data' in result and result['data']:
-                            reservation_id = result['data'].get('reservationID', 'N/A')
-                        print(f"✓ SUCCESS: Reservation {i+1}/{num_reservations} created (ID: {reservation_id}) | Total: {total_created + 1}", flush=True)
-                        room_results['created'] += 1
-                        room_results['stay_lengths'].append(stay_length)
-                        total_created += 1
-                    else:
-                        error_msg = f"Reservation {i+1}: {result['error']}"
-                        print(f"✗ ERROR: {error_msg}", flush=True)
-                        room_results['errors'].append(error_msg)
-                        total_errors += 1
-
-                    # Add delay between API calls to prevent rate limiting (0.3 seconds)
-                    # This ensures we don't hit API rate limits while keeping total time reasonable
-                    if i < num_reservations - 1:  # Don't delay after the last reservation
-                        time.sleep(0.3)  # 300ms delay - fast enough to avoid HTTP timeout, slow enough to avoid rate limits
-
-                except Exception as e:
-                    error_msg = f"Reservation {i+1}: {str(e)}"
-                    print(f"✗ EXCEPTION: {error_msg}", flush=True)
-                    import traceback
-                    traceback.print_exc()
-                    room_results['errors'].append(error_msg)
-                    total_errors += 1
-                    # Continue to next reservation even if this one failed
-                    print(f"→ Continuing to next reservation despite error...", flush=True)
-                    continue
-            
-            results.append(room_results)
-
-        # Print final summary
-        print(f"\n{'='*80}", flush=True)
-        print("RESERVATION CREATION COMPLETE - FINAL SUMMARY", flush=True)
-        print(f"{'='*80}", flush=True)
-        print(f"✓ Total Reservations Successfully Created: {total_created}", flush=True)
-        print(f"✗ Total Errors: {total_errors}", flush=True)
-        print(f"\nBreakdown by Room Type:", flush=True)
-        for result in results:
-            print(f"  - {result['roomTypeName']}: {result['created']}/{result['requested']} created", flush=True)
-            if result['errors']:
-                print(f"    Errors: {len(result['errors'])}", flush=True)
-
-            # Show stay length statistics
-            if result['stay_lengths']:
-                avg_stay = sum(result['stay_lengths']) / len(result['stay_lengths'])
-                min_stay = min(result['stay_lengths'])
-                max_stay = max(result['stay_lengths'])
-                print(f"    Stay lengths: {min_stay}-{max_stay} nights (avg: {avg_stay:.1f} nights)", flush=True)
-
-                # Show distribution
-                from collections import Counter
-                stay_counts = Counter(result['stay_lengths'])
-                distribution = ', '.join([f"{nights}n: {count}" for nights, count in sorted(stay_counts.items())])
-                print(f"    Distribution: {distribution}", flush=True)
-        print(f"{'='*80}\n", flush=True)
+    return {
+        'results': [summarize_room_results(result) for result in results],
+        'summary': {
+            'total_created': total_created,
+            'total_errors': total_errors,
+            'reservations_created': reservations_created,
+            'cancelled': job.cancel_event.is_set(),
+            'seed': data.get('seed')
+        }
+    }
 
-        return jsonify({
-            'success': True,
-            'data': {
-                'results': results,
-                'summary': {
-                    'total_created': total_created,
-                    'total_errors': total_errors
-                }
-            }
-        })
-        
-    except Exception as e:
-        print(f"\n{'='*80}")
-        print(f"CRITICAL ERROR in create_reservations")
-        print(f"{'='*80}")
-        print(f"Error: {e}")
-        import traceback
-        traceback.print_exc()
-        print(f"{'='*80}\n")
-        return jsonify({'success': False, 'error': str(e)})
+def run_reservation_cleanup(job, credentials, data):
+    """Cancel reservations created by earlier fills (runs on a job thread)
+
+    Targets come from the journal or, with source='api', a getReservations prefix scan.
+    """
+    max_workers, requests_per_second, burst = dispatch_settings(data)
+    limiter = job_rate_limiter(job, requests_per_second, burst)
+    circuit_breaker = new_circuit_breaker()
+
+    if data.get('source', 'journal') == 'api':
+        prefix = data.get('prefix', DEMO_ID_PREFIX)
+        log.info("Scanning reservations for thirdPartyIdentifier prefix %r (job %s)", prefix, job.id)
+        targets = find_reservations_by_prefix(credentials, prefix, limiter,
+                                              data.get('startDate'), data.get('endDate'))
+    else:
+        targets = fill_journal.created_reservations(credentials['property_id'], data.get('jobId'))
+
+    total_cancelled = 0
+    total_errors = 0
+    # Same bounded error summary as a fill; each failure is also kept in the journal
+    failures = {'failed': 0, 'errors': Counter()}
+    job.update_progress(total=len(targets), cancelled=0, errors=0)
+    log.info("Cancelling %d reservations (workers: %d, rate limit: %s req/s, burst %d)",
+             len(targets), max_workers, requests_per_second, burst)
+    dispatch_started = time.monotonic()
+
+    def cancel(target):
+        return cancel_reservation_task(target, credentials, limiter, job.cancel_event, circuit_breaker)
+
+    cancelling = False
+    for target, result in iter_dispatch(with_call_slot(job, cancel), targets, max_workers, job.cancel_event):
+        if job.cancel_event.is_set() and not cancelling:
+            log.warning("Job %s cancelled - leaving the remaining reservations in place", job.id)
+            cancelling = True
+        if result.get('cancelled'):
+            continue
+
+        if result['success']:
+            total_cancelled += 1
+            fill_journal.record_cancellation(target['reservationID'])
+            metrics.inc('cloudbeds_cleanup_reservations_total', outcome='cancelled')
+            reservation_log.info("Reservation %s cancelled | Total: %d/%d",
+                                 target['reservationID'], total_cancelled, len(targets),
+                                 extra={'job_id': job.id, 'reservation_id': target['reservationID']})
+        else:
+            total_errors += 1
+            record_failure(failures, result['error'])
+            fill_journal.record_cancellation_failure(target['reservationID'], result['error'])
+            metrics.inc('cloudbeds_cleanup_reservations_total', outcome='failed')
+            reservation_log.warning("Reservation %s not cancelled: %s", target['reservationID'], result['error'],
+                                    extra={'job_id': job.id, 'reservation_id': target['reservationID']})
+
+        job.update_progress(cancelled=total_cancelled, errors=total_errors)
+        completed = total_cancelled + total_errors
+        elapsed = time.monotonic() - dispatch_started
+        rate = completed / elapsed if elapsed > 0 else 0.0
+        job.publish(
+            'reservation',
+            outcome='cancelled' if result['success'] else 'failed',
+            reservationID=target['reservationID'],
+            error=None if result['success'] else result['error'],
+            cancelled=total_cancelled,
+            errors=total_errors,
+            total=len(targets),
+            rate=round(rate, 2),
+            eta_seconds=round((len(targets) - completed) / rate, 1) if rate > 0 else None
+        )
+
+    fill_journal.flush()
+    log.info("Reservation cleanup complete (job %s): %d cancelled, %d errors", job.id, total_cancelled, total_errors)
+
+    return {
+        'errors': summarize_room_results(failures)['errors'],
+        'summary': {
+            'total_found': len(targets),
+            'total_cancelled': total_cancelled,
+            'total_errors': total_errors,
+            'cancelled': job.cancel_event.is_set()
+        }
+    }
 
 if __name__ == '__main__':
     # Get port from environment variable (for cloud hosting) or use 5000 for local
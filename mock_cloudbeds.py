@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""Local stand-in for the Cloudbeds API, for offline testing and benchmarks
+
+Serves getRoomTypes, getSources, getAvailableRoomTypes, getReservations,
+postReservation and putReservation (cancellation) with configurable
+latency, random errors, HTTP 429 injection, a server-side rate limit and
+per-night capacity enforcement. --ambiguous-rate books a reservation but answers HTTP 504,
+like a gateway timing out after the API did the work. Point the app at it
+with:
+
+    python mock_cloudbeds.py --port 8089 --room-types "Standard:50,Suite:10"
+    CLOUDBEDS_API_BASE=http://127.0.0.1:8089/api/v1.3 python main.py
+
+GET /mock/stats returns server-side counters; POST /mock/reset clears all
+bookings and counters.
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+
+class MockCloudbeds:
+    """In-memory property state and fault injection shared by all request threads"""
+
+    def __init__(self, room_types, latency_ms=50, jitter_ms=20, error_rate=0.0, throttle_rate=0.0,
+                 rate_limit=0.0, seed=None, ambiguous_rate=0.0):
+        self.room_types = room_types
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.rate_limit = rate_limit
+        self.ambiguous_rate = ambiguous_rate
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.bookings = {rt['roomTypeID']: Counter() for rt in self.room_types}
+            self.reservations = {}
+            self.next_reservation_id = 100000
+            self.stats = Counter()
+            self.tokens = self.rate_limit
+            self.last_refill = time.monotonic()
+
+    def _take_rate_token(self):
+        """Server-side token bucket (burst = one second of traffic); False when exhausted"""
+        if not self.rate_limit:
+            return True
+        now = time.monotonic()
+        self.tokens = min(self.rate_limit, self.tokens + (now - self.last_refill) * self.rate_limit)
+        self.last_refill = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def handle(self, method, endpoint, query, form):
+        """Return (status, body, headers) for one API request"""
+        delay = max(0.0, self.latency_ms + self.rng.uniform(-self.jitter_ms, self.jitter_ms)) / 1000
+        time.sleep(delay)
+
+        with self.lock:
+            self.stats['requests'] += 1
+            self.stats[f'requests.{endpoint}'] += 1
+
+            if not self._take_rate_token() or self.rng.random() < self.throttle_rate:
+                self.stats['throttled'] += 1
+                return 429, {'success': False, 'message': 'Too many requests'}, {'Retry-After': '1'}
+
+            if self.rng.random() < self.error_rate:
+                self.stats['errors'] += 1
+                return 503, {'success': False, 'message': 'Service temporarily unavailable'}, {}
+
+        if endpoint == 'getRoomTypes' and method == 'GET':
+            return 200, {'success': True, 'data': self.room_types}, {}
+        if endpoint == 'getSources' and method == 'GET':
+            return 200, {'success': True, 'data': [{'sourceID': 'ss-mock-1', 'sourceName': 'Mock Website'}]}, {}
+        if endpoint == 'getReservations' and method == 'GET':
+            return self.get_reservations(query)
+        if endpoint == 'getAvailableRoomTypes' and method == 'GET':
+            return self.get_available_room_types(query)
+        if endpoint == 'postReservation' and method == 'POST':
+            return self.post_reservation(form)
+        if endpoint == 'putReservation' and method == 'PUT':
+            return self.put_reservation(form)
+        return 404, {'success': False, 'message': f'Unknown endpoint {method} {endpoint}'}, {}
+
+    def post_reservation(self, form):
+        try:
+            start = datetime.strptime(form['startDate'], '%Y-%m-%d')
+            end = datetime.strptime(form['endDate'], '%Y-%m-%d')
+            rooms = json.loads(form['rooms'])
+        except (KeyError, ValueError) as e:
+            return 400, {'success': False, 'message': f'Invalid reservation: {e}'}, {}
+
+        nights = [(start + timedelta(days=d)).strftime('%Y-%m-%d') for d in range((end - start).days)]
+        units = {rt['roomTypeID']: rt['roomTypeUnits'] for rt in self.room_types}
+
+        with self.lock:
+            # Check every room and night before booking anything
+            for room in rooms:
+                room_type_id = room.get('roomTypeID')
+                if room_type_id not in units:
+                    return 400, {'success': False, 'message': f'Unknown roomTypeID {room_type_id}'}, {}
+                quantity = int(room.get('quantity', 1))
+                for night in nights:
+                    if self.bookings[room_type_id][night] + quantity > units[room_type_id]:
+                        self.stats['sold_out'] += 1
+                        return 400, {'success': False, 'message': f'No availability for {room_type_id} on {night}'}, {}
+
+            for room in rooms:
+                quantity = int(room.get('quantity', 1))
+                for night in nights:
+                    self.bookings[room['roomTypeID']][night] += quantity
+
+            self.next_reservation_id += 1
+            reservation_id = str(self.next_reservation_id)
+            self.reservations[reservation_id] = {
+                'reservationID': reservation_id,
+                'thirdPartyIdentifier': form.get('thirdPartyIdentifier'),
+                'startDate': form['startDate'],
+                'endDate': form['endDate'],
+                'rooms': rooms,
+                'status': 'confirmed'
+            }
+            self.stats['created'] += 1
+
+            if self.rng.random() < self.ambiguous_rate:
+                self.stats['ambiguous'] += 1
+                return 504, {'success': False, 'message': 'Gateway timeout'}, {}
+
+        return 200, {'success': True, 'reservationID': reservation_id}, {}
+
+    def get_available_room_types(self, query):
+        """Rooms of each type free on every night of the stay; sold-out types are left out
+
+        With detailedRates=true each room type also lists roomsAvailable per night in roomRateDetailed.
+        """
+        try:
+            start = datetime.strptime(query['startDate'], '%Y-%m-%d')
+            end = datetime.strptime(query['endDate'], '%Y-%m-%d')
+        except (KeyError, ValueError) as e:
+            return 400, {'success': False, 'message': f'Invalid dates: {e}'}, {}
+
+        nights = [(start + timedelta(days=d)).strftime('%Y-%m-%d') for d in range((end - start).days)]
+        rooms = []
+        with self.lock:
+            for rt in self.room_types:
+                booked = self.bookings[rt['roomTypeID']]
+                available = rt['roomTypeUnits'] - max((booked[night] for night in nights), default=0)
+                if available > 0:
+                    room = {'roomTypeID': rt['roomTypeID'], 'roomTypeName': rt['roomTypeName'],
+                            'roomsAvailable': available}
+                    if query.get('detailedRates') == 'true':
+                        room['roomRateDetailed'] = [{'date': night, 'roomsAvailable': rt['roomTypeUnits'] - booked[night]}
+                                                    for night in nights]
+                    rooms.append(room)
+        return 200, {'success': True, 'data': [{'propertyID': '1', 'propertyRooms': rooms}],
+                     'roomCount': len(rooms)}, {}
+
+    def get_reservations(self, query):
+        page = max(1, int(query.get('pageNumber', 1)))
+        page_size = min(100, max(1, int(query.get('pageSize', 100))))
+        check_in_from = query.get('checkInFrom')
+        check_in_to = query.get('checkInTo')
+
+        with self.lock:
+            matching = [
+                {k: r[k] for k in ('reservationID', 'thirdPartyIdentifier', 'startDate', 'endDate', 'status')}
+                for r in self.reservations.values()
+                if (not check_in_from or r['startDate'] >= check_in_from)
+                and (not check_in_to or r['startDate'] <= check_in_to)
+            ]
+        rows = matching[(page - 1) * page_size:page * page_size]
+        return 200, {'success': True, 'data': rows, 'count': len(rows), 'total': len(matching)}, {}
+
+    def put_reservation(self, form):
+        """Only status changes are supported; cancelling frees the booked nights"""
+        with self.lock:
+            reservation = self.reservations.get(form.get('reservationID'))
+            if reservation is None:
+                return 400, {'success': False, 'message': f"Reservation {form.get('reservationID')} not found"}, {}
+
+            if form.get('status') == 'canceled' and reservation['status'] != 'canceled':
+                start = datetime.strptime(reservation['startDate'], '%Y-%m-%d')
+                end = datetime.strptime(reservation['endDate'], '%Y-%m-%d')
+                for d in range((end - start).days):
+                    night = (start + timedelta(days=d)).strftime('%Y-%m-%d')
+                    for room in reservation['rooms']:
+                        self.bookings[room['roomTypeID']][night] -= int(room.get('quantity', 1))
+                self.stats['cancelled'] += 1
+            if form.get('status'):
+                reservation['status'] = form['status']
+
+        return 200, {'success': True}, {}
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'stats': dict(self.stats),
+                'reservations': len(self.reservations),
+                'occupancy': {rt_id: dict(sorted(nights.items())) for rt_id, nights in self.bookings.items()}
+            }
+
+
+def make_handler(mock):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        # Headers and body go out in separate writes; avoid Nagle/delayed-ACK stalls
+        disable_nagle_algorithm = True
+
+        def _send(self, status, body, headers=None):
+            payload = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def _dispatch(self, method):
+            parsed = urlparse(self.path)
+            length = int(self.headers.get('Content-Length') or 0)
+            raw_body = self.rfile.read(length).decode() if length else ''
+
+            if parsed.path == '/mock/stats':
+                return self._send(200, mock.snapshot())
+            if parsed.path == '/mock/reset':
+                mock.reset()
+                return self._send(200, {'success': True})
+
+            form = {k: v[0] for k, v in parse_qs(raw_body).items()}
+            query = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+            endpoint = parsed.path.rstrip('/').rsplit('/', 1)[-1]
+            status, body, headers = mock.handle(method, endpoint, query, form)
+            self._send(status, body, headers)
+
+        def do_GET(self):
+            self._dispatch('GET')
+
+        def do_POST(self):
+            self._dispatch('POST')
+
+        def do_PUT(self):
+            self._dispatch('PUT')
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def parse_room_types(spec):
+    """'Standard:50,Suite:10' -> Cloudbeds-style room type records"""
+    room_types = []
+    for idx, item in enumerate(spec.split(',')):
+        name, units = item.split(':')
+        room_types.append({
+            'roomTypeID': f'rt-{idx + 1}',
+            'roomTypeName': name.strip(),
+            'roomTypeUnits': int(units),
+            'maxGuests': 2
+        })
+    return room_types
+
+
+class MockServer(ThreadingHTTPServer):
+    # The default listen backlog of 5 drops connections when a client opens many at once
+    request_queue_size = 256
+    daemon_threads = True
+
+
+def serve(mock, host='127.0.0.1', port=8089):
+    server = MockServer((host, port), make_handler(mock))
+    return server
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Offline mock of the Cloudbeds API")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--room-types', default='Standard:50,Deluxe:20,Suite:10',
+                        help="Comma-separated name:units pairs")
+    parser.add_argument('--latency-ms', type=float, default=50, help="Mean response latency")
+    parser.add_argument('--jitter-ms', type=float, default=20, help="Uniform latency jitter (+/-)")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Fraction of requests answered with HTTP 503")
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help="Fraction of requests answered with HTTP 429")
+    parser.add_argument('--rate-limit', type=float, default=0.0,
+                        help="Server-side requests/sec before answering 429 (0 = unlimited)")
+    parser.add_argument('--ambiguous-rate', type=float, default=0.0,
+                        help="Fraction of reservations booked but answered with HTTP 504")
+    parser.add_argument('--seed', type=int, default=None)
+    return parser
+
+
+if __name__ == '__main__':
+    args = build_parser().parse_args()
+    mock = MockCloudbeds(parse_room_types(args.room_types), args.latency_ms, args.jitter_ms,
+                         args.error_rate, args.throttle_rate, args.rate_limit, args.seed, args.ambiguous_rate)
+    server = serve(mock, args.host, args.port)
+    print(f"Mock Cloudbeds API on http://{args.host}:{args.port}/api/v1.3", flush=True)
+    for rt in mock.room_types:
+        print(f"  {rt['roomTypeID']}: {rt['roomTypeName']} ({rt['roomTypeUnits']} units)", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\nStats: {json.dumps(mock.snapshot()['stats'])}")